@@ -1,9 +1,9 @@
 import streamlit as st
-import speech_recognition as sr
 from streamlit_mic_recorder import mic_recorder
 import os
-import io
-from pydub import AudioSegment
+
+import stt
+import tracing
 
 # main2.py ko 'main' naam se import kar rahe hain
 import main2 as main
@@ -13,6 +13,31 @@ import main2 as main
 # ---------------------------
 st.set_page_config(page_title="💰 Hissab Assistant", layout="centered")
 
+# Embedding model aur vector DB ek hi baar (per server process) background mein load hote hain,
+# taaki UI turant render ho. Pehli query agar pehle aa jaaye to wahi load poora hone ka wait karti hai.
+@st.cache_resource(show_spinner=False)
+def start_model_warmup():
+    return main.start_background_warmup()
+
+start_model_warmup()
+
+# STT engine (aur offline model, agar Vosk ho) bhi process mein ek hi baar load hota hai
+@st.cache_resource(show_spinner=False)
+def get_stt_engine():
+    return stt.get_stt_engine()
+
+# Sirf signed-in users (Streamlit auth, st.login) ki apni history (per-user shard) hoti hai.
+# Anonymous sessions shared store se hi seekhte aur padhte hain, jaise pehle. User id kabhi
+# URL ya kisi aur client input se nahi li jaati, warna koi bhi kisi aur ka shard khol sakta hai.
+def authenticated_user_id():
+    user = getattr(st, "user", None)
+    try:
+        if user is None or not user.get("is_logged_in"):
+            return None
+        return user.get("sub") or user.get("email")
+    except Exception:
+        return None
+
 st.title("💰 Hissab Assistant (Smart RAG Version)")
 st.write("Apni kahani bolkar ya likhkar bhejiye, main aapka hisaab nikal dunga.")
 
@@ -31,35 +56,21 @@ if mode == "🎤 Voice":
         st.info("Audio record ho gaya hai. Ab process kiya ja raha hai...")
         st.audio(audio_info['bytes']) # Browser can play the original format
         
-        recognizer = sr.Recognizer()
-        converted_audio_path = "audio_converted.wav"
         try:
-            # 1. Audio bytes ko memory mein load karein
-            # Browser se mila audio WebM/Opus format mein ho sakta hai
-            sound = AudioSegment.from_file(io.BytesIO(audio_info['bytes']))
-            
-            # 2. Sahi WAV format mein convert karke save karein
-            sound.export(converted_audio_path, format="wav")
-            
-            # 3. Ab convert hui file ko speech recognition ke liye istemal karein
-            with sr.AudioFile(converted_audio_path) as source:
-                audio_data = recognizer.record(source)
-            
-            # Google Speech Recognition se audio ko text mein badlein
-            recognized_text = recognizer.recognize_google(audio_data, language='hi-IN')
+            # Browser se mila audio WebM/Opus format mein ho sakta hai. Use memory mein hi
+            # 16 kHz mono PCM mein decode karke configured STT backend (HISSAB_STT_BACKEND:
+            # Google ya offline Vosk) se text mein badalte hain. Koi temporary file nahi banti.
+            with tracing.span("stt"):
+                recognized_text = get_stt_engine().transcribe(audio_info['bytes'])
             st.success(f"📝 Aapne kaha: {recognized_text}")
             user_story = recognized_text
 
-        except sr.UnknownValueError:
+        except stt.NoSpeechError:
             st.warning("Maaf kijiye, main aapki aawaz samajh nahin paya.")
-        except sr.RequestError as e:
-            st.error(f"Google Speech Recognition service se connect nahin ho paya; {e}")
+        except stt.ServiceError as e:
+            st.error(f"Speech recognition service kaam nahin kar rahi; {e}")
         except Exception as e:
             st.error(f"Audio process karte samay error aaya: {e}")
-        finally:
-            # Temporary converted file ko delete karein
-            if os.path.exists(converted_audio_path):
-                os.remove(converted_audio_path)
 
 # --- Text Input Logic ---
 else:
@@ -82,14 +93,16 @@ if user_story:
     else:
         with st.spinner('Smart RAG system hisaab laga raha hai...'):
             try:
-                response_generator = main.process_query_stream(api_key, user_story)
-                detailed_text = st.write_stream(response_generator)
+                # Audio summary TTS starts in the background as soon as the conclusion streams
+                summary_job = main.AudioSummaryJob(api_key, slow=False)
+                response_generator = main.process_query_stream(api_key, user_story, user_id=authenticated_user_id())
+                detailed_text = st.write_stream(summary_job.watch(response_generator))
                 
                 if detailed_text and detailed_text.strip():
                     st.divider()
                     st.subheader("🔊 Audio Summary")
                     with st.spinner('Audio summary banaya ja raha hai...'):
-                        audio_file = main.generate_audio_summary(api_key, detailed_text, slow=False)
+                        audio_file = summary_job.result(timeout=60)
                         if audio_file and os.path.exists(audio_file):
                             st.audio(audio_file, format="audio/mp3")
                         else:
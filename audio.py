@@ -0,0 +1,74 @@
+# audio.py - In-Memory Audio Pipeline for Voice Input
+#
+# The browser recorder hands us compressed audio (usually WebM/Opus). Speech recognition
+# wants 16 kHz mono 16-bit PCM. Instead of decoding with pydub, exporting a WAV file to disk
+# and reading it back, ffmpeg decodes, downmixes and resamples in one pass between pipes, and
+# the PCM goes straight into sr.AudioData. Nothing touches the filesystem, so concurrent
+# sessions cannot clobber each other's files.
+
+import io
+import subprocess
+import threading
+
+TARGET_SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # bytes per sample (s16le)
+CHANNELS = 1
+
+_FFMPEG_COMMAND = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+                   "-f", "s16le", "-acodec", "pcm_s16le", "-ac", str(CHANNELS), "-ar", str(TARGET_SAMPLE_RATE), "pipe:1"]
+
+def iter_pcm_chunks(audio_bytes: bytes, chunk_ms: int = 500):
+    """
+    Decodes `audio_bytes` to 16 kHz mono s16le PCM and yields it in chunks of about `chunk_ms`
+    milliseconds as ffmpeg produces them, so consumers can start before decoding finishes.
+    Falls back to pydub (still fully in memory) if ffmpeg cannot be started directly.
+    """
+    chunk_bytes = TARGET_SAMPLE_RATE * SAMPLE_WIDTH * CHANNELS * chunk_ms // 1000
+    try:
+        process = subprocess.Popen(_FFMPEG_COMMAND, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        pcm = _decode_with_pydub(audio_bytes)
+        for start in range(0, len(pcm), chunk_bytes):
+            yield pcm[start:start + chunk_bytes]
+        return
+
+    # Feed stdin from a helper thread; writing everything first could deadlock once the
+    # stdout pipe buffer fills up.
+    def feed():
+        try:
+            process.stdin.write(audio_bytes)
+        except BrokenPipeError:
+            pass
+        finally:
+            process.stdin.close()
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    try:
+        while True:
+            chunk = process.stdout.read(chunk_bytes)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        process.stdout.close()
+        writer.join()
+        stderr = process.stderr.read().decode(errors="replace").strip()
+        process.stderr.close()
+        if process.wait() != 0:
+            raise ValueError(f"Audio decode nahi ho paya: {stderr or 'ffmpeg error'}")
+
+def _decode_with_pydub(audio_bytes: bytes) -> bytes:
+    from pydub import AudioSegment
+    sound = AudioSegment.from_file(io.BytesIO(audio_bytes))
+    sound = sound.set_frame_rate(TARGET_SAMPLE_RATE).set_channels(CHANNELS).set_sample_width(SAMPLE_WIDTH)
+    return sound.raw_data
+
+def decode_to_pcm(audio_bytes: bytes) -> bytes:
+    """Decodes browser audio to 16 kHz mono s16le PCM entirely in memory."""
+    return b"".join(iter_pcm_chunks(audio_bytes))
+
+def to_audio_data(audio_bytes: bytes):
+    """Converts recorded audio bytes into an sr.AudioData ready for speech recognition."""
+    import speech_recognition as sr
+    return sr.AudioData(decode_to_pcm(audio_bytes), TARGET_SAMPLE_RATE, SAMPLE_WIDTH)
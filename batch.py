@@ -0,0 +1,144 @@
+# batch.py - Batch Processing of Hisaab Stories (nightly backfills)
+#
+# Reads a JSONL file of stories, encodes all of them with a single embedding-model encode
+# call, classifies them locally, and then runs the ambiguous classifications plus the Gemini
+# generations on a bounded thread pool. Retries with backoff, timeouts and the global
+# concurrency limit come from the shared LLM client (llm_client.py). Each result is written
+# to the output JSONL as soon as it is ready.
+#
+# Input lines:  {"id": "...", "story": "..."}      ("user_story" or "text" also accepted)
+# Output lines: {"id": "...", "story": "...", "category": "...", "response": "...", "error": null}
+#
+# Usage:
+#   python batch.py stories.jsonl results.jsonl --concurrency 8
+#
+# For tests, run with HISSAB_LLM_BACKEND=fake or pass `client=LLMClient(FakeBackend(...))`.
+
+import argparse
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+import vectordb
+from llm_client import get_llm_client
+from rag import get_enhanced_prompt
+from vectordb import QueryContext
+
+load_dotenv()
+
+def _read_stories(input_path: str) -> list:
+    stories = []
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            story = item.get("story") or item.get("user_story") or item.get("text") or ""
+            stories.append({"id": item.get("id", line_number), "story": story})
+    return stories
+
+def _process_one(client, item: dict, context: QueryContext) -> dict:
+    result = {"id": item["id"], "story": item["story"], "category": None, "response": None, "error": None}
+    if not item["story"]:
+        result["error"] = "empty story"
+        return result
+    try:
+        # The embedding is already on the context, so this only retrieves (plus an LLM
+        # classification if the local classifier was not confident).
+        enhanced_prompt = get_enhanced_prompt(item["story"], context=context)
+        result["category"] = context.category
+        result["response"] = client.generate(enhanced_prompt)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+def process_batch(input_path: str, output_path: str, concurrency: int = 8, learn: bool = True,
+                  client=None) -> dict:
+    """
+    Processes every story in `input_path` and streams results to `output_path`.
+
+    Args:
+        input_path: JSONL file of stories.
+        output_path: JSONL file that results are appended to as they complete.
+        concurrency: Maximum number of stories in flight at once (LLM calls are further capped by
+            HISSAB_LLM_MAX_CONCURRENCY).
+        learn: Add successfully answered stories to the vector DB, like process_query_stream does.
+        client: LLMClient to generate with; defaults to the shared client (HISSAB_LLM_BACKEND).
+
+    Returns:
+        A summary dict with counts of processed, failed and learned stories and the wall time.
+    """
+    start = time.perf_counter()
+    client = client or get_llm_client()
+
+    vectordb.ensure_vector_db()
+
+    items = _read_stories(input_path)
+    print(f"{len(items)} stories process ki ja rahi hain (concurrency={concurrency})...")
+    if not items:
+        open(output_path, "w", encoding="utf-8").close()
+        return {"processed": 0, "failed": 0, "learned": 0, "seconds": round(time.perf_counter() - start, 2)}
+
+    # 1. One encode call for the whole batch
+    embeddings = vectordb.get_embedding_model().encode([item["story"] for item in items], batch_size=64, show_progress_bar=True)
+
+    # 2. Local classification up front (cheap, no network); ambiguous ones are left for the pool
+    contexts = []
+    for item, embedding in zip(items, embeddings):
+        context = QueryContext(item["story"], embedding=embedding, encode_calls=1)
+        category, similarity, margin = vectordb.classify_locally(embedding)
+        if vectordb.CLASSIFIER_MODE != "llm" and vectordb.is_confident(similarity, margin):
+            context.category = category
+            context.classify_calls = 1
+        contexts.append(context)
+
+    # 3. Retrieval + generation with at most `concurrency` stories in flight
+    summary = {"processed": 0, "failed": 0, "learned": 0}
+    to_learn = []
+    with open(output_path, "w", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = {}
+        work = iter(enumerate(zip(items, contexts)))
+
+        def submit_next():
+            for position, (item, context) in work:
+                pending[pool.submit(_process_one, client, item, context)] = position
+                return
+
+        for _ in range(concurrency * 2):
+            submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                position = pending.pop(future)
+                result = future.result()
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                summary["processed"] += 1
+                if result["error"]:
+                    summary["failed"] += 1
+                elif learn and result["response"]:
+                    to_learn.append(position)
+                submit_next()
+
+    # 4. One batched DB commit after the pool is done (one append, one index update)
+    to_learn.sort()
+    vectordb.add_user_prompts_to_db([items[p]["story"] for p in to_learn], [contexts[p] for p in to_learn])
+    summary["learned"] = len(to_learn)
+
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    print(f"Batch poora hua: {summary}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Process a JSONL file of hisaab stories in batch.")
+    parser.add_argument("input", help="Input JSONL with one story per line.")
+    parser.add_argument("output", help="Output JSONL for the results.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--no-learn", action="store_true", help="Do not add the stories to the vector DB.")
+    args = parser.parse_args()
+    process_batch(args.input, args.output, concurrency=args.concurrency, learn=not args.no_learn)
+
+if __name__ == "__main__":
+    main()
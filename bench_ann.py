@@ -0,0 +1,79 @@
+# bench_ann.py - Recall@k vs. Latency Benchmark for the ANN (IVF) Index
+#
+# Builds a synthetic multi-hundred-thousand-row corpus of clustered embeddings (real prompt
+# embeddings are clustered by topic, unlike uniform noise, on which no ANN index works well),
+# then compares vector_index.IVFIndex at several nprobe settings against exact search.
+#
+# Usage:
+#   python bench_ann.py
+#   python bench_ann.py --rows 500000 --categories 10 --nprobe 1 4 8 16 32
+
+import argparse
+import time
+
+import numpy as np
+
+from vector_index import ExactIndex, IVFIndex
+
+DIM = 384
+
+def _synthetic_corpus(rows, categories, clusters, rng):
+    centers = rng.standard_normal((clusters, DIM)).astype(np.float32)
+    cluster_ids = rng.integers(0, clusters, rows)
+    embeddings = centers[cluster_ids] + 1.5 * rng.standard_normal((rows, DIM)).astype(np.float32)
+    # Tie each cluster to one category, as prompts about the same thing share a category
+    return embeddings, cluster_ids % categories, centers
+
+def _measure(index, queries, top_k):
+    results, latencies = [], []
+    for category, query in queries:
+        start = time.perf_counter()
+        rows, _ = index.search(category, query, top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(set(rows.tolist()))
+    return results, np.array(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IVF recall@k and latency against exact search.")
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=2_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"Corpus banaya ja raha hai: {args.rows} rows x {DIM} dims, {args.categories} categories...")
+    embeddings, categories, centers = _synthetic_corpus(args.rows, args.categories, args.clusters, rng)
+
+    def build(index):
+        start = time.perf_counter()
+        for category in range(args.categories):
+            rows = np.flatnonzero(categories == category)
+            index.add(category, rows, embeddings[rows])
+        return time.perf_counter() - start
+
+    exact = ExactIndex(DIM)
+    exact_build = build(exact)
+    ivf = IVFIndex(DIM)
+    ivf_build = build(ivf)
+
+    # Queries are fresh points near existing clusters, i.e. new prompts about known topics
+    query_clusters = rng.integers(0, args.clusters, args.queries)
+    queries = [(int(c % args.categories), centers[c] + 1.5 * rng.standard_normal(DIM).astype(np.float32))
+               for c in query_clusters]
+
+    truth, exact_ms = _measure(exact, queries, args.top_k)
+    print(f"build: exact {exact_build:.1f}s, ivf {ivf_build:.1f}s (incl. k-means)")
+    print(f"{'backend':<14} {'recall@' + str(args.top_k):>9} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'exact':<14} {1.0:>9.3f} {np.percentile(exact_ms, 50):>8.3f} {np.percentile(exact_ms, 95):>8.3f}")
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        found, ivf_ms = _measure(ivf, queries, args.top_k)
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+        print(f"{'ivf nprobe=' + str(nprobe):<14} {recall:>9.3f} {np.percentile(ivf_ms, 50):>8.3f} "
+              f"{np.percentile(ivf_ms, 95):>8.3f}")
+
+if __name__ == "__main__":
+    main()
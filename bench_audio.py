@@ -0,0 +1,82 @@
+# bench_audio.py - Voice Input Conversion Benchmark (temp WAV file vs. in-memory pipeline)
+#
+# Compares the old app2.py conversion (pydub decode -> export WAV to disk -> sr.AudioFile ->
+# recognizer.record) with audio.to_audio_data (ffmpeg pipes -> 16 kHz mono PCM ->
+# sr.AudioData). Reports median latency and peak Python heap (tracemalloc) per clip, plus the
+# size of the PCM handed to the recognizer.
+#
+# Without arguments, WebM/Opus test clips of 3, 10 and 30 seconds are synthesized with ffmpeg.
+#
+# Usage:
+#   python bench_audio.py
+#   python bench_audio.py recording1.webm recording2.webm --repeats 10
+
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import speech_recognition as sr
+from pydub import AudioSegment
+
+import audio
+
+def _legacy_convert(audio_bytes: bytes, workdir: str):
+    converted_audio_path = os.path.join(workdir, "audio_converted.wav")
+    sound = AudioSegment.from_file(io.BytesIO(audio_bytes))
+    sound.export(converted_audio_path, format="wav")
+    with sr.AudioFile(converted_audio_path) as source:
+        audio_data = sr.Recognizer().record(source)
+    os.remove(converted_audio_path)
+    return audio_data
+
+def _synthesize_clips(workdir: str) -> list:
+    paths = []
+    for seconds in (3, 10, 30):
+        path = os.path.join(workdir, f"synthetic_{seconds}s.webm")
+        # Speech-like test signal: a tone sweep mixed with pink noise, 48 kHz stereo like a browser mic
+        subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                        "-f", "lavfi", "-i", f"sine=frequency=300:beep_factor=4:duration={seconds}:sample_rate=48000",
+                        "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.05:duration={seconds}:sample_rate=48000",
+                        "-filter_complex", "amix=inputs=2,aformat=channel_layouts=stereo",
+                        "-c:a", "libopus", "-b:a", "32k", path], check=True)
+        paths.append(path)
+    return paths
+
+def _measure(fn, repeats: int) -> tuple:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(latencies), peak / 1024 / 1024, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark voice input conversion.")
+    parser.add_argument("clips", nargs="*", help="Recorded clips (WebM/Opus, WAV, ...).")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        clips = args.clips or _synthesize_clips(workdir)
+        print(f"{'clip':<24} {'pipeline':<10} {'median ms':>10} {'peak heap MB':>13} {'PCM KB':>8} {'rate':>6}")
+        for path in clips:
+            with open(path, "rb") as f:
+                audio_bytes = f.read()
+            name = os.path.basename(path)
+            for label, fn in (("temp-wav", lambda: _legacy_convert(audio_bytes, workdir)),
+                              ("in-memory", lambda: audio.to_audio_data(audio_bytes))):
+                median_ms, peak_mb, audio_data = _measure(fn, args.repeats)
+                print(f"{name:<24} {label:<10} {median_ms:>10.1f} {peak_mb:>13.2f} "
+                      f"{len(audio_data.frame_data) / 1024:>8.0f} {audio_data.sample_rate:>6}")
+
+if __name__ == "__main__":
+    main()
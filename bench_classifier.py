@@ -0,0 +1,100 @@
+# bench_classifier.py - Accuracy/Latency Benchmark for the Category Classifier
+#
+# Compares the local centroid classifier (with and without the LLM fallback) against the
+# original Gemini classifier on held-out Hinglish queries for the INITIAL_PROMPTS categories.
+#
+# Usage:
+#   python bench_classifier.py            # local + hybrid (+ llm if GOOGLE_API_KEY is set)
+#   python bench_classifier.py --no-llm   # skip every Gemini call
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+import vectordb
+
+# Held-out queries: none of these appear in INITIAL_PROMPTS, so the centroids have not seen them.
+LABELED_QUERIES = [
+    ("personal_expense_tracking", "Kal 120 ka auto liya, 80 ki chai pi aur 300 ki kitaab li. Total kitna hua?"),
+    ("personal_expense_tracking", "Aaj sabzi 200 ki, doodh 60 ka aur petrol 500 ka dalwaya."),
+    ("personal_expense_tracking", "Is hafte maine 1500 ka ration aur 400 ki dawai kharidi."),
+    ("group_settlement", "Hum 4 log dinner pe gaye, Amit ne 2400 ka bill diya. Sabko kitna dena hai?"),
+    ("group_settlement", "Manali trip mein maine 8000 diye, Priya ne 4000. Hum 3 log the, hisaab barabar karo."),
+    ("group_settlement", "Flat ka kiraya 18000 hai, teen roommates mein baatna hai, Rahul ne poora bhar diya."),
+    ("monthly_budget_and_savings", "Meri income 40000 hai, kiraya 12000 aur khaana 8000. Mahine mein kitna bacha paunga?"),
+    ("monthly_budget_and_savings", "Har mahine 60000 milte hain, 35000 kharch ho jaate hain. Saal ki bachat kitni hogi?"),
+    ("monthly_budget_and_savings", "Salary 30000 hai aur main 20% bachana chahta hoon, budget kaise banau?"),
+    ("price_comparison", "Amazon par laptop 52000 ka hai aur Flipkart par 49999 ka, kahan lena sasta padega?"),
+    ("price_comparison", "1 kilo chawal 60 ka ya 5 kilo ka packet 280 ka, kaunsa better deal hai?"),
+    ("price_comparison", "Do dukaanon mein TV ka daam 30000 aur 31500 hai, kitna farak hai?"),
+    ("lending_and_borrowing", "Maine Vikas ko 5000 udhaar diye, usne 2000 wapas kar diye. Kitne baaki hain?"),
+    ("lending_and_borrowing", "Mujhe bhai se 10000 lene the, abhi tak sirf 3000 mile hain."),
+    ("lending_and_borrowing", "Neha ne mujhse 1500 udhaar liye the, aaj 1000 lautaye."),
+    ("investment_and_profit", "Maine 20000 ka sona khareeda tha, ab uski keemat 26000 hai. Kitna fayda hua?"),
+    ("investment_and_profit", "Mutual fund mein 1 lakh lagaya tha, ab 1.2 lakh ho gaya, return kitna hai?"),
+    ("investment_and_profit", "Shares 40000 mein liye the aur 35000 mein beche, kitna nuksaan hua?"),
+    ("loan_and_emi", "Car loan ki EMI 12000 hai, 3 saal mein kitna bhar dunga?"),
+    ("loan_and_emi", "Home loan 20 lakh ka hai, 18000 mahine ki kisht hai, 5 saal mein kitna chukega?"),
+    ("loan_and_emi", "Bike ke liye 60000 ka loan liya, 2500 EMI hai, kitne mahine lagenge?"),
+    ("income_and_balance", "Wallet mein 3000 the, 7000 mile freelancing se, fir 1200 ka recharge kiya. Kitne bache?"),
+    ("income_and_balance", "Bank mein 15000 the, 5000 nikale aur 20000 jama kiye, ab balance kya hai?"),
+    ("income_and_balance", "Account mein 8000 hain, rent 6000 gaya aur 4000 bonus aaya."),
+    ("discount_and_offers", "Joote 2500 ke hain, 30% off chal raha hai, kitne ke padenge?"),
+    ("discount_and_offers", "Mobile 15000 ka hai aur 10 pratishat chhoot hai, final daam batao."),
+    ("discount_and_offers", "Sale mein 1000 ki shirt par flat 15% discount hai, kitna bachega?"),
+    ("salary_calculation", "Mujhe ek ghante ke 150 milte hain, maine 40 ghante kaam kiya, kitni kamai hui?"),
+    ("salary_calculation", "Roz ki dihadi 600 hai, is mahine 22 din kaam kiya, salary kitni banegi?"),
+    ("salary_calculation", "Mera din ka rate 1000 hai aur 18 din ka kaam kiya, payment kitna hoga?"),
+]
+
+def _run(name, classify):
+    correct = 0
+    latencies = []
+    for expected, query in LABELED_QUERIES:
+        start = time.perf_counter()
+        predicted = classify(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += predicted == expected
+    latencies = np.array(latencies)
+    print(f"{name:<8} accuracy={correct / len(LABELED_QUERIES):6.1%}  "
+          f"mean={latencies.mean():8.2f}ms  p50={np.percentile(latencies, 50):8.2f}ms  "
+          f"p95={np.percentile(latencies, 95):8.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the category classifier.")
+    parser.add_argument("--no-llm", action="store_true", help="Skip benchmarks that call Gemini.")
+    args = parser.parse_args()
+
+    # Load the DB and embedding model so the first timed query does not pay for lazy init
+    vectordb.warm_up()
+
+    fallbacks = 0
+    def local_only(query):
+        embedding = vectordb.get_embedding_model().encode([query])[0]
+        return vectordb.classify_locally(embedding)[0]
+
+    def hybrid(query):
+        nonlocal fallbacks
+        embedding = vectordb.get_embedding_model().encode([query])[0]
+        category, similarity, margin = vectordb.classify_locally(embedding)
+        if vectordb.is_confident(similarity, margin):
+            return category
+        fallbacks += 1
+        if args.no_llm or not os.getenv("GOOGLE_API_KEY"):
+            return category
+        return vectordb.get_category_from_llm(query)
+
+    print(f"{len(LABELED_QUERIES)} queries, threshold: similarity>={vectordb.CLASSIFIER_MIN_SIMILARITY} "
+          f"margin>={vectordb.CLASSIFIER_MIN_MARGIN}")
+    _run("local", local_only)
+    _run("hybrid", hybrid)
+    print(f"         hybrid sent {fallbacks}/{len(LABELED_QUERIES)} queries to the LLM fallback")
+    if not args.no_llm and os.getenv("GOOGLE_API_KEY"):
+        _run("llm", vectordb.get_category_from_llm)
+    else:
+        print("llm      skipped (no GOOGLE_API_KEY or --no-llm)")
+
+if __name__ == "__main__":
+    main()
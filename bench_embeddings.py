@@ -0,0 +1,117 @@
+# bench_embeddings.py - Embedding Backend Benchmark (latency, memory, retrieval agreement)
+#
+# Every backend from embeddings.py is loaded in its own fresh process, which reports load
+# time, single-query encode latency and resident memory (RSS), and encodes the stored prompts
+# plus the held-out queries from bench_classifier.py. Retrieval agreement is the average
+# top-3 overlap with the full-precision "torch" backend when searching the stored prompts.
+# The same agreement is reported for torch vectors stored as float16 and int8.
+#
+# Usage:
+#   python bench_embeddings.py                      # all backends
+#   python bench_embeddings.py --backends torch int8
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from bench_classifier import LABELED_QUERIES
+from vector_index import ExactIndex
+from vector_store import VectorStore
+
+TOP_K = 3
+
+_WORKER = r'''
+import json, sys, time
+import numpy as np
+backend, texts_path, out_path = sys.argv[1:4]
+from embeddings import load_embedding_model
+from tracing import rss_mb
+from vectordb import MODEL_NAME
+
+texts = json.load(open(texts_path, encoding="utf-8"))
+start = time.perf_counter()
+model = load_embedding_model(MODEL_NAME, backend)
+load_s = time.perf_counter() - start
+model.encode(["warm up"])
+latencies = []
+for text in texts[:50]:
+    start = time.perf_counter()
+    model.encode([text])
+    latencies.append((time.perf_counter() - start) * 1000)
+np.save(out_path, model.encode(texts, batch_size=64))
+print(json.dumps({"load_s": load_s, "encode_p50_ms": float(np.percentile(latencies, 50)),
+                  "encode_p95_ms": float(np.percentile(latencies, 95)), "rss_mb": rss_mb()}))
+'''
+
+def _stored_prompts() -> list:
+    import vectordb
+    store = VectorStore(vectordb.STORE_BASE_PATH)
+    if store.exists():
+        store.load()
+        return [store.get_record(row)["user_text"] for row in range(len(store))]
+    return [p["user_text"] for p in vectordb.INITIAL_PROMPTS]
+
+def _top_k(corpus: np.ndarray, queries: np.ndarray) -> list:
+    index = ExactIndex(corpus.shape[1])
+    index.add("all", np.arange(len(corpus)), corpus)
+    return [set(index.search("all", q, TOP_K)[0].tolist()) for q in queries]
+
+def _agreement(reference: list, other: list) -> float:
+    return float(np.mean([len(a & b) / len(a) for a, b in zip(reference, other)]))
+
+def _roundtrip(embeddings: np.ndarray, dtype: str, workdir: str) -> np.ndarray:
+    """Stores embeddings in a VectorStore of the given dtype and reads them back."""
+    store = VectorStore(os.path.join(workdir, f"roundtrip_{dtype}"), dtype=dtype)
+    store.create(embeddings.shape[1])
+    store.append([{"category": "all"} for _ in range(len(embeddings))], embeddings)
+    return np.asarray(store.embeddings, dtype=np.float32)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the embedding backends.")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "int8"])
+    args = parser.parse_args()
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+
+    corpus_texts = _stored_prompts()
+    query_texts = [query for _, query in LABELED_QUERIES]
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        texts_path = os.path.join(workdir, "texts.json")
+        with open(texts_path, "w", encoding="utf-8") as f:
+            json.dump(corpus_texts + query_texts, f, ensure_ascii=False)
+
+        print(f"{len(corpus_texts)} stored prompts, {len(query_texts)} queries, top-{TOP_K} agreement vs torch")
+        print(f"{'backend':<16} {'load s':>7} {'p50 ms':>7} {'p95 ms':>7} {'RSS MB':>7} {'top-3 agree':>12}")
+        reference = None
+        for backend in backends:
+            out_path = os.path.join(workdir, f"{backend}.npy")
+            result = subprocess.run([sys.executable, "-c", _WORKER, backend, texts_path, out_path],
+                                    capture_output=True, text=True, cwd=here)
+            if result.returncode != 0:
+                print(f"{backend:<16} failed: {result.stderr.strip().splitlines()[-1] if result.stderr else 'unknown error'}")
+                continue
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            vectors = np.load(out_path)
+            corpus, queries = vectors[:len(corpus_texts)], vectors[len(corpus_texts):]
+            found = _top_k(corpus, queries)
+            if backend == "torch":
+                reference, torch_corpus, torch_queries = found, corpus, queries
+            agreement = _agreement(reference, found) if reference else float("nan")
+            print(f"{backend:<16} {stats['load_s']:>7.2f} {stats['encode_p50_ms']:>7.2f} {stats['encode_p95_ms']:>7.2f} "
+                  f"{stats['rss_mb']:>7.0f} {agreement:>12.3f}")
+
+        if reference:
+            for dtype in ("float16", "int8"):
+                stored = _roundtrip(torch_corpus, dtype, workdir)
+                agreement = _agreement(reference, _top_k(stored, torch_queries))
+                size = stored.shape[1] * np.dtype(dtype).itemsize
+                print(f"{'torch @ ' + dtype:<16} {'-':>7} {'-':>7} {'-':>7} {'-':>7} {agreement:>12.3f}   ({size} bytes/row)")
+
+if __name__ == "__main__":
+    main()
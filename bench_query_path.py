@@ -0,0 +1,166 @@
+# bench_query_path.py - End-to-End Query Path Benchmark (per-stage p50/p95/p99)
+#
+# Replays a corpus of stories through the real query path (STT -> process_query_stream ->
+# audio summary), with the LLM, STT and TTS replaced by offline stubs of configurable latency,
+# and prints the tracing metrics per stage. The corpus is INITIAL_PROMPTS plus variants with
+# other amounts and names, so not everything is answered by the response cache.
+#
+# Everything runs against a fresh vector store, response cache and audio cache in a temporary
+# directory. The embedding model is the real one unless --stub-embeddings is given (a hashing
+# encoder, for machines without the model; classification quality then means nothing).
+#
+# Usage:
+#   python bench_query_path.py --stories 200
+#   python bench_query_path.py --no-local-calc --llm-chunk-ms 20 --json baseline.json
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import types
+
+NAMES = ["Rohit", "Suman", "Aman", "Priya", "Karan", "Neha", "Vikram", "Anjali"]
+
+def build_corpus(seed_prompts: list, count: int, seed: int = 0) -> list:
+    """The seed stories first, then variants with scaled amounts and swapped names."""
+    rng = random.Random(seed)
+    stories = []
+    for i in range(count):
+        story = seed_prompts[i % len(seed_prompts)]["user_text"]
+        if i >= len(seed_prompts):
+            factor = rng.choice([2, 3, 4, 5, 6, 8, 10])
+            story = re.sub(r"\d[\d,]*", lambda m: str(int(m.group().replace(",", "")) * factor), story)
+            for name in NAMES:
+                story = story.replace(name, rng.choice(NAMES))
+        stories.append(story)
+    return stories
+
+class StubSTT:
+    """'Transcribes' by decoding the UTF-8 story the benchmark passed in as audio bytes."""
+    name = "stub"
+
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+
+    def transcribe(self, audio_bytes: bytes) -> str:
+        time.sleep(self.latency_ms / 1000)
+        return audio_bytes.decode("utf-8")
+
+class HashingEncoder:
+    """Deterministic bag-of-character-trigrams encoder standing in for the embedding model."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, **kwargs):
+        import numpy as np
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = f"  {text.lower()} "
+            for i in range(len(text) - 2):
+                digest = hashlib.blake2b(text[i:i + 3].encode("utf-8"), digest_size=4).digest()
+                vectors[row, int.from_bytes(digest, "little") % self.dim] += 1.0
+        return vectors
+
+def _install_stub_tts(latency_ms: float):
+    """Registers a fake `gtts` module so tts.synthesize() runs without network."""
+    class gTTS:
+        def __init__(self, text, lang="hi", tld="com", slow=False):
+            self.text = text
+
+        def save(self, path):
+            time.sleep(latency_ms / 1000)
+            with open(path, "wb") as f:
+                f.write(b"ID3" + self.text.encode("utf-8"))
+
+    sys.modules["gtts"] = types.SimpleNamespace(gTTS=gTTS)
+
+class _EventCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def emit(self, record):
+        self.events.append(json.loads(record.getMessage()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the whole query path with stubbed LLM/STT/TTS.")
+    parser.add_argument("--stories", type=int, default=100)
+    parser.add_argument("--llm-chunk-ms", type=float, default=10.0, help="Fake LLM latency per streamed word.")
+    parser.add_argument("--stt-ms", type=float, default=50.0, help="Stub STT latency per clip.")
+    parser.add_argument("--tts-ms", type=float, default=80.0, help="Stub TTS latency per synthesis.")
+    parser.add_argument("--no-local-calc", action="store_true", help="Send arithmetic stories to the (fake) LLM too.")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache.")
+    parser.add_argument("--stub-embeddings", action="store_true", help="Use a hashing encoder instead of the model.")
+    parser.add_argument("--json", help="Also write the metrics snapshot to this file.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="hissab_bench_")
+    # Configuration is read at import time, so set it before importing the app modules
+    os.environ.update({
+        "HISSAB_LLM_BACKEND": "fake",
+        "HISSAB_FAKE_LLM_LATENCY_MS": str(args.llm_chunk_ms),
+        "HISSAB_STORE_PATH": os.path.join(workdir, "hissab_vector_db"),
+        "HISSAB_CACHE_PATH": os.path.join(workdir, "hissab_response_cache.pkl"),
+        "HISSAB_AUDIO_CACHE_DIR": os.path.join(workdir, "audio_cache"),
+        "HISSAB_LOCAL_CALC": "0" if args.no_local_calc else "1",
+        "HISSAB_EAGER_LOAD": "0",
+    })
+    if args.no_cache:
+        os.environ["HISSAB_CACHE_MAX_ENTRIES"] = "0"
+    _install_stub_tts(args.tts_ms)
+
+    import main2
+    import stt
+    import tracing
+    import vectordb
+
+    if args.stub_embeddings:
+        vectordb._embedding_model = HashingEncoder()
+    stt.STT_ENGINES["stub"] = lambda: StubSTT(args.stt_ms)
+
+    collector = _EventCollector()
+    tracing.logger.addHandler(collector)
+    tracing.logger.setLevel(logging.INFO)
+
+    print(f"Warm-up (model + DB load) in {workdir} ...")
+    main2.warm_up()
+    tracing.reset_metrics()
+
+    stories = build_corpus(vectordb.INITIAL_PROMPTS, args.stories, seed=args.seed)
+    start = time.perf_counter()
+    for story in stories:
+        text = stt.transcribe(story.encode("utf-8"), backend="stub")
+        job = main2.AudioSummaryJob("bench")
+        for _ in job.watch(main2.process_query_stream("bench", text)):
+            pass
+        job.result(timeout=60)
+    vectordb.flush_writes(timeout=60)
+    wall_s = time.perf_counter() - start
+
+    snapshot = main2.metrics_snapshot()
+    paths = {}
+    for event in collector.events:
+        paths[event.get("path")] = paths.get(event.get("path"), 0) + 1
+    snapshot["paths"] = paths
+    snapshot["wall_s"] = round(wall_s, 2)
+
+    print(f"\n{len(stories)} stories in {wall_s:.1f}s, paths: {paths}")
+    print(f"{'stage':<16} {'count':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, stats in snapshot["stages"].items():
+        print(f"{stage:<16} {stats['count']:>6} {stats['mean_ms']:>9.2f} {stats['p50_ms']:>9.2f} "
+              f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+    print(f"write queue: {snapshot['write_queue']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# bench_retrieval.py - Retrieval Scaling Benchmark
+#
+# Measures per-query top-k retrieval latency as the learned DB grows, comparing the original
+# find_similar_prompts approach (boolean category filter over all rows, list-of-arrays ->
+# matrix conversion, cosine over unnormalized rows, full argsort) against vector_index.ExactIndex.
+# Uses synthetic random embeddings, so no model download is needed.
+#
+# Usage:
+#   python bench_retrieval.py
+#   python bench_retrieval.py --sizes 1000 10000 100000 500000 --queries 50
+
+import argparse
+import time
+
+import numpy as np
+
+from vector_index import ExactIndex
+
+DIM = 384
+NUM_CATEGORIES = 10
+
+def _legacy_search(categories, embedding_list, category, query, top_k):
+    # Mirrors the pre-index implementation step by step
+    mask = categories == category
+    all_embeddings = np.array([embedding_list[i] for i in np.flatnonzero(mask)])
+    norms = np.linalg.norm(all_embeddings, axis=1) * np.linalg.norm(query)
+    similarities = (all_embeddings @ query) / norms
+    return np.argsort(similarities)[-top_k:][::-1]
+
+def _time_ms(fn, queries):
+    start = time.perf_counter()
+    for category, query in queries:
+        fn(category, query)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark top-k retrieval as the DB grows.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 300_000])
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--skip-legacy-above", type=int, default=300_000,
+                        help="Skip the (slow) legacy path for DBs larger than this.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>9} {'legacy ms/q':>12} {'index ms/q':>11} {'speedup':>8} {'index build s':>14}")
+    for size in args.sizes:
+        embeddings = rng.standard_normal((size, DIM)).astype(np.float32)
+        categories = rng.integers(0, NUM_CATEGORIES, size)
+        queries = [(int(rng.integers(0, NUM_CATEGORIES)), rng.standard_normal(DIM).astype(np.float32))
+                   for _ in range(args.queries)]
+
+        start = time.perf_counter()
+        index = ExactIndex(DIM)
+        for category in range(NUM_CATEGORIES):
+            rows = np.flatnonzero(categories == category)
+            index.add(category, rows, embeddings[rows])
+        build_s = time.perf_counter() - start
+
+        index_ms = _time_ms(lambda c, q: index.search(c, q, args.top_k), queries)
+        if size <= args.skip_legacy_above:
+            embedding_list = list(embeddings)
+            legacy_ms = _time_ms(lambda c, q: _legacy_search(categories, embedding_list, c, q, args.top_k), queries)
+            print(f"{size:>9} {legacy_ms:>12.3f} {index_ms:>11.3f} {legacy_ms / index_ms:>7.1f}x {build_s:>14.2f}")
+        else:
+            print(f"{size:>9} {'-':>12} {index_ms:>11.3f} {'-':>8} {build_s:>14.2f}")
+
+if __name__ == "__main__":
+    main()
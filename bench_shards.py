@@ -0,0 +1,118 @@
+# bench_shards.py - Per-User Shard Benchmark (resident memory and query latency)
+#
+# Populates per-user shards (shards.py) for --users simulated users: each has 1-3 categories
+# with 1..--max-prompts prompts, as random unit vectors. It then replays --queries retrievals
+# from a Zipf-skewed population (a few heavy users and a long tail) under several memory caps.
+# For each cap it reports:
+#   - the resident shards and MB tracked by the LRU,
+#   - process RSS,
+#   - the LRU hit rate,
+#   - p50/p95/p99 query latency (shard loads included).
+#
+# The "monolithic" row is the old layout for comparison: every user's rows held in one index
+# per category, all resident, and each query scanning the whole category.
+#
+# Usage:
+#   python bench_shards.py                          # 10k users, caps 16/64/256 MB
+#   python bench_shards.py --users 2000 --caps 8 32
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from shards import ShardManager
+from tracing import percentile, rss_mb
+from vector_index import ExactIndex, normalize
+
+CATEGORIES = ["personal_expense_tracking", "group_settlement", "monthly_budget_and_savings", "price_comparison",
+              "lending_and_borrowing", "investment_and_profit", "loan_and_emi", "income_and_balance",
+              "discount_and_offers", "salary_calculation"]
+
+def populate(root: str, users: int, max_prompts: int, dim: int, rng) -> dict:
+    """Writes every user's shards to `root`; returns {user_id: [categories]}."""
+    writer = ShardManager(root=root, memory_cap_mb=0, fsync=False)
+    layout = {}
+    for user in range(users):
+        user_id = f"user-{user}"
+        categories = list(rng.choice(CATEGORIES, size=rng.integers(1, 4), replace=False))
+        for category in categories:
+            count = int(rng.integers(1, max_prompts + 1))
+            records = [{"category": category, "user_text": f"{user_id} prompt {i} " + "x" * 60,
+                        "model_response": "**Isliye, ...** " + "y" * 120} for i in range(count)]
+            writer.append(user_id, category, records, normalize(rng.standard_normal((count, dim))))
+        layout[user_id] = categories
+    return layout
+
+def _query_stream(layout: dict, queries: int, dim: int, rng) -> list:
+    user_ids = list(layout)
+    # Zipf over user rank: heavy users dominate, the long tail is touched rarely
+    ranks = (rng.zipf(1.3, size=queries) - 1) % len(user_ids)
+    stream = []
+    for rank in ranks:
+        user_id = user_ids[rank]
+        categories = layout[user_id]
+        stream.append((user_id, categories[rng.integers(len(categories))], rng.standard_normal(dim).astype(np.float32)))
+    return stream
+
+def _report(label: str, latencies_ms: list, resident: str, hit_rate: str):
+    latencies_ms = sorted(latencies_ms)
+    print(f"{label:<12} {resident:>22} {rss_mb():>8.0f} {hit_rate:>8} {percentile(latencies_ms, 50):>8.3f} "
+          f"{percentile(latencies_ms, 95):>8.3f} {percentile(latencies_ms, 99):>8.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-user shards against one global index.")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--max-prompts", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--caps", type=float, nargs="+", default=[16, 64, 256], help="Memory caps in MB.")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    root = tempfile.mkdtemp(prefix="hissab_shards_")
+    try:
+        start = time.perf_counter()
+        layout = populate(root, args.users, args.max_prompts, args.dim, rng)
+        shard_count = sum(len(c) for c in layout.values())
+        print(f"{args.users} users, {shard_count} shards written in {time.perf_counter() - start:.1f}s ({root})")
+        stream = _query_stream(layout, args.queries, args.dim, rng)
+
+        print(f"{'layout':<12} {'resident shards / MB':>22} {'RSS MB':>8} {'hit %':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for cap in args.caps:
+            manager = ShardManager(root=root, memory_cap_mb=cap)
+            latencies = []
+            for user_id, category, query in stream:
+                t0 = time.perf_counter()
+                manager.search(user_id, category, query, args.top_k)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            stats = manager.stats()
+            hit_rate = 100 * stats["hits"] / max(stats["hits"] + stats["loads"], 1)
+            _report(f"shards {cap:g}MB", latencies, f"{stats['resident_shards']} / {stats['resident_mb']:.1f}", f"{hit_rate:.1f}")
+            del manager
+
+        # Old layout: one index per category over every user's rows, all in memory
+        loader = ShardManager(root=root, memory_cap_mb=0)
+        index = ExactIndex(args.dim)
+        row = 0
+        for user_id, categories in layout.items():
+            for category in categories:
+                shard = loader._get(user_id, category)
+                rows, vectors = shard.index.get(category)
+                index.add(category, np.arange(row, row + len(rows)), vectors)
+                row += len(rows)
+        latencies = []
+        for _, category, query in stream:
+            t0 = time.perf_counter()
+            index.search(category, query, args.top_k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        _report("monolithic", latencies, f"all / {index.nbytes / 1024 / 1024:.1f}", "-")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
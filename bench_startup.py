@@ -0,0 +1,61 @@
+# bench_startup.py - Cold-Start Benchmark (import time and first-query latency)
+#
+# Each scenario runs in a fresh Python process so nothing is cached between runs:
+#   eager      - HISSAB_EAGER_LOAD=1, the old behaviour: importing main2 loads the DB and model.
+#   lazy       - importing main2 is cheap; the first query pays for the loads.
+#   background - lazy import, then start_background_warmup() while the "user" is busy for
+#                --think-time seconds (typing / recording) before the first query.
+#
+# "First query" is everything up to the LLM call: classification, retrieval and prompt
+# assembly via rag.get_enhanced_prompt, so no API key is needed.
+#
+# Usage:
+#   python bench_startup.py --runs 3
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+_SCENARIO = r'''
+import json, os, sys, time
+scenario, think_time = sys.argv[1], float(sys.argv[2])
+start = time.perf_counter()
+import main2
+import_s = time.perf_counter() - start
+if scenario == "background":
+    main2.start_background_warmup()
+    time.sleep(think_time)
+start = time.perf_counter()
+main2.ensure_vector_db()
+from rag import get_enhanced_prompt
+get_enhanced_prompt("Hum 3 dost Goa gaye, maine 6000 diye aur Rohit ne 3000.")
+first_query_s = time.perf_counter() - start
+print(json.dumps({"import_s": import_s, "first_query_s": first_query_s}))
+'''
+
+def _run(scenario: str, think_time: float) -> dict:
+    env = dict(os.environ, HISSAB_EAGER_LOAD="1" if scenario == "eager" else "0")
+    output = subprocess.run([sys.executable, "-c", _SCENARIO, scenario, str(think_time)], env=env,
+                            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import time and first-query latency.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--think-time", type=float, default=5.0,
+                        help="Seconds between app start and the first query in the background scenario.")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<11} {'import s':>9} {'first query s':>14} {'import + query s':>17}")
+    for scenario in ("eager", "lazy", "background"):
+        runs = [_run(scenario, args.think_time) for _ in range(args.runs)]
+        import_s = np.median([r["import_s"] for r in runs])
+        query_s = np.median([r["first_query_s"] for r in runs])
+        print(f"{scenario:<11} {import_s:>9.2f} {query_s:>14.2f} {import_s + query_s:>17.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# bench_stt.py - Speech-to-Text Latency/WER Benchmark
+#
+# Runs every STT backend in stt.py over the small Hinglish clip set listed in
+# bench_data/stt_clips.jsonl and reports transcription latency (from "recording finished" to
+# "text ready", which is what adds to time-to-first-token), real-time factor and word error
+# rate. Google tends to answer hi-IN in Devanagari while Vosk's Hindi models may answer in
+# either script, so each hypothesis is scored against the reference in its own script.
+#
+# The audio is NOT shipped with the repo; only the manifest is. Record each manifest
+# `reference` sentence yourself (any format ffmpeg decodes, e.g. a phone voice note) and
+# save it as bench_data/<file>, i.e. bench_data/stt_clips/goa_trip.mp3 and so on (see
+# bench_data/stt_clips/README.md). Use real recordings, not TTS: synthesized audio is far
+# cleaner than real speech and would make every backend look better than it is. If any clip
+# is missing the benchmark stops and lists them.
+#
+# Usage:
+#   python bench_stt.py                       # google + vosk
+#   python bench_stt.py --backends vosk --repeats 3
+
+import argparse
+import json
+import os
+import re
+import statistics
+import time
+
+import stt
+from audio import SAMPLE_WIDTH, TARGET_SAMPLE_RATE, decode_to_pcm
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_data")
+MANIFEST_PATH = os.path.join(BENCH_DIR, "stt_clips.jsonl")
+
+def _load_clips() -> list:
+    clips = []
+    with open(MANIFEST_PATH, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                clips.append(json.loads(line))
+    missing = [clip["file"] for clip in clips if not os.path.exists(os.path.join(BENCH_DIR, clip["file"]))]
+    if missing:
+        raise SystemExit(f"{len(missing)} STT clip(s) nahi mile {BENCH_DIR} mein: {', '.join(missing)}. "
+                         f"Manifest ({MANIFEST_PATH}) ke 'reference' sentences record karke inhi naamon se rakhiye.")
+    for clip in clips:
+        path = os.path.join(BENCH_DIR, clip["file"])
+        with open(path, "rb") as f:
+            clip["bytes"] = f.read()
+        clip["duration_s"] = len(decode_to_pcm(clip["bytes"])) / (TARGET_SAMPLE_RATE * SAMPLE_WIDTH)
+    return clips
+
+def _words(text: str) -> list:
+    # Devanagari vowel signs are not \w, so keep the whole Devanagari block explicitly
+    return re.sub(r"[^\w\s\u0900-\u097F]", " ", text.lower()).split()
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(len(ref), 1)
+
+def _score(clip: dict, hypothesis: str) -> float:
+    devanagari = bool(re.search(r"[ऀ-ॿ]", hypothesis))
+    return word_error_rate(clip["reference_devanagari"] if devanagari else clip["reference"], hypothesis)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark STT backends on the bundled Hinglish clips.")
+    parser.add_argument("--backends", nargs="+", default=list(stt.STT_ENGINES))
+    parser.add_argument("--repeats", type=int, default=1)
+    args = parser.parse_args()
+
+    clips = _load_clips()
+    total_audio_s = sum(c["duration_s"] for c in clips)
+    print(f"{len(clips)} clips, {total_audio_s:.1f}s audio")
+    print(f"{'backend':<8} {'p50 ms':>8} {'max ms':>8} {'RTF':>6} {'WER':>6}  load s")
+    for backend in args.backends:
+        start = time.perf_counter()
+        try:
+            engine = stt.get_stt_engine(backend)
+        except (stt.ServiceError, ValueError) as e:
+            print(f"{backend:<8} skipped: {e}")
+            continue
+        load_s = time.perf_counter() - start
+
+        latencies, errors, transcribed_s = [], [], 0.0
+        for clip in clips:
+            hypothesis = None
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                try:
+                    hypothesis = engine.transcribe(clip["bytes"])
+                except stt.NoSpeechError:
+                    hypothesis = ""
+                except stt.ServiceError as e:
+                    print(f"{backend:<8} {clip['id']}: {e}")
+                    hypothesis = None
+                    break
+                latencies.append((time.perf_counter() - start) * 1000)
+                transcribed_s += clip["duration_s"]
+            if hypothesis is not None:
+                errors.append(_score(clip, hypothesis))
+        if not latencies:
+            continue
+        rtf = sum(latencies) / 1000 / transcribed_s
+        print(f"{backend:<8} {statistics.median(latencies):>8.0f} {max(latencies):>8.0f} {rtf:>6.2f} "
+              f"{statistics.mean(errors):>6.2f}  {load_s:.1f}")
+
+if __name__ == "__main__":
+    main()
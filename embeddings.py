@@ -0,0 +1,32 @@
+# embeddings.py - Embedding Model Backends for CPU-Only Deployments
+#
+# All backends load the same 'paraphrase-multilingual-MiniLM-L12-v2' weights and return a
+# SentenceTransformer, so callers keep using .encode() and vectors from different backends
+# can share one vector DB:
+#   "torch" - full-precision PyTorch (the original behaviour).
+#   "onnx"  - ONNX Runtime via sentence-transformers' onnx backend (needs
+#             `pip install optimum[onnxruntime]`; the model is exported on first load).
+#   "int8"  - PyTorch with dynamically int8-quantized Linear layers (torch only, no export).
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "int8")
+
+def load_embedding_model(model_name: str, backend: str = "torch"):
+    """Loads `model_name` with the requested backend and returns a SentenceTransformer."""
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+
+    if backend == "onnx":
+        try:
+            return SentenceTransformer(model_name, backend="onnx")
+        except TypeError as e:
+            raise ValueError("ONNX backend ke liye sentence-transformers>=3.2 aur optimum[onnxruntime] chahiye.") from e
+
+    if backend == "int8":
+        import torch
+        model = SentenceTransformer(model_name, device="cpu")
+        # Weights of every Linear layer become int8; activations are quantized on the fly
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    raise ValueError(f"Unknown embedding backend: {backend} (choose from {', '.join(EMBEDDING_BACKENDS)})")
@@ -0,0 +1,468 @@
+# hisaab_calc.py - Deterministic Local Arithmetic Engine
+#
+# For the categories that are plain arithmetic (group_settlement, personal_expense_tracking,
+# discount_and_offers, salary_calculation, loan_and_emi) the answer can be computed exactly
+# and instantly instead of asking the LLM. This module extracts amounts, people, percentages
+# and durations from the Hinglish story and formats the answer like the INITIAL_PROMPTS
+# examples.
+#
+# Every solver is deliberately conservative: if anything in the story does not fit the
+# expected shape (an amount without an owner, an unknown person count, extra numbers, cue
+# words from another category...), it returns None and the caller falls back to the LLM.
+
+import re
+
+# --- Token-level extraction ---
+_TOKEN_PATTERN = re.compile(r"₹?\d[\d,]*(?:\.\d+)?%?|[^\W\d_]+|[.,;?!]")
+_MULTIPLIERS = {"k": 1_000, "hazaar": 1_000, "hazar": 1_000, "hajar": 1_000, "thousand": 1_000,
+                "lakh": 100_000, "lac": 100_000, "lakhs": 100_000, "crore": 10_000_000, "cr": 10_000_000}
+_PERCENT_WORDS = {"percent", "pratishat", "pratisat", "pct", "prtishat"}
+_NUMBER_WORDS = {"ek": 1, "do": 2, "teen": 3, "chaar": 4, "char": 4, "paanch": 5, "panch": 5,
+                 "chhe": 6, "chhah": 6, "saat": 7, "aath": 8, "nau": 9, "das": 10}
+_CURRENCY_WORDS = {"rupaye", "rupay", "rupees", "rupee", "rs", "rupiya", "rupaiya", "inr"}
+_CONNECTORS = {"ka", "ki", "ke", "ek", "ko", "se", "par", "pe", "mein", "me", "ne", "wala", "wali", "wale"}
+_PEOPLE_WORDS = {"dost", "log", "logon", "jan", "jane", "friends", "doston", "roommates", "bhai", "members"}
+_SELF_PAYER_WORDS = {"maine", "mainne", "mene", "humne"}
+_SELF_WORDS = _SELF_PAYER_WORDS | {"main", "hum", "mera", "meri", "mere", "hamara", "hamari", "hamare"}
+_RECIPIENT_WORDS = {"ko", "mujhe", "mujhko", "humko", "hume", "humein", "hamein"}
+_PRONOUNS = {"maine", "mainne", "mene", "usne", "unhone", "humne", "kisi", "sabne", "kisne", "aapne", "tumne", "kisine"}
+_NON_NAMES = {"hum", "main", "maine", "mera", "meri", "aaj", "kal", "ek", "is", "us", "emi", "upi", "rs", "inr", "sabko"}
+
+# Words that mean the story is about something other than the category it was classified as
+_FOREIGN_CUES = {
+    "personal_expense_tracking": {"salary", "udhaar", "udhar", "mile", "mila", "aaye", "aayi", "jama", "bachat",
+                                  "discount", "off", "emi", "loan", "hissa", "baant", "dost", "share", "profit",
+                                  "bache", "bacha", "bachi", "balance", "baaki", "baki"},
+    "group_settlement": {"udhaar", "udhar", "lautaye", "lautaya", "wapas", "vaapas", "emi", "loan", "discount"},
+    "discount_and_offers": {"emi", "loan", "salary", "dost", "udhaar"},
+    "salary_calculation": {"emi", "loan", "discount", "udhaar", "kharch"},
+    "loan_and_emi": {"discount", "salary", "dost"},
+}
+
+def _tokens(text: str) -> list:
+    return _TOKEN_PATTERN.findall(text)
+
+def _is_number(token: str) -> bool:
+    return token.lstrip("₹")[:1].isdigit()
+
+def _quantities(tokens: list) -> list:
+    """
+    Groups tokens into numbers: returns dicts with the numeric value, whether it is a
+    percentage, and the token positions it spans (multiplier words such as "lakh" included).
+    """
+    quantities = []
+    for i, token in enumerate(tokens):
+        if _is_number(token):
+            raw = token.lstrip("₹")
+            percent = raw.endswith("%")
+            value = float(raw.rstrip("%").replace(",", ""))
+            end = i
+            following = tokens[i + 1].lower() if i + 1 < len(tokens) else ""
+            if following in _MULTIPLIERS:
+                value *= _MULTIPLIERS[following]
+                end = i + 1
+            elif following in _PERCENT_WORDS:
+                percent = True
+                end = i + 1
+            quantities.append({"value": value, "percent": percent, "start": i, "end": end})
+    return quantities
+
+def _word_after(tokens: list, index: int, skip=()) -> str:
+    for token in tokens[index + 1:]:
+        word = token.lower()
+        if word in skip:
+            continue
+        return word if token.isalpha() else ""
+    return ""
+
+def _word_before(tokens: list, index: int, skip=()) -> str:
+    for token in reversed(tokens[:index]):
+        word = token.lower()
+        if word in skip:
+            continue
+        return word if token.isalpha() else ""
+    return ""
+
+def _is_separator(token: str) -> bool:
+    return token in ".,;?!" or token.lower() == "aur"
+
+def _clauses(tokens: list) -> list:
+    """Splits the token list at punctuation and 'aur' into clauses (lists of tokens)."""
+    clauses, current = [], []
+    for token in tokens:
+        if _is_separator(token):
+            if current:
+                clauses.append(current)
+            current = []
+        else:
+            current.append(token)
+    if current:
+        clauses.append(current)
+    return clauses
+
+def _clause_span(tokens: list, index: int) -> tuple:
+    """(start, end) token positions of the clause containing tokens[index]."""
+    start, end = index, index + 1
+    while start > 0 and not _is_separator(tokens[start - 1]):
+        start -= 1
+    while end < len(tokens) and not _is_separator(tokens[end]):
+        end += 1
+    return start, end
+
+def _has_foreign_cues(tokens: list, category: str) -> bool:
+    words = {t.lower() for t in tokens}
+    return bool(words & _FOREIGN_CUES.get(category, set()))
+
+# --- Formatting ---
+def format_inr(amount: float) -> str:
+    """Formats an amount with Indian digit grouping, e.g. 200000 -> '₹2,00,000'."""
+    negative = amount < 0
+    amount = abs(round(amount, 2))
+    whole = int(amount)
+    fraction = f"{amount - whole:.2f}"[1:] if amount != whole else ""
+    digits = str(whole)
+    if len(digits) > 3:
+        head, tail = digits[:-3], digits[-3:]
+        groups = []
+        while len(head) > 2:
+            groups.insert(0, head[-2:])
+            head = head[:-2]
+        groups.insert(0, head)
+        digits = ",".join(groups) + "," + tail
+    return ("-" if negative else "") + "₹" + digits + fraction
+
+def _plain(amount: float) -> str:
+    """Number without grouping, as used inside the '(800 x 25)' style explanations."""
+    return f"{amount:g}" if amount != int(amount) else str(int(amount))
+
+# --- Solvers ---
+def solve_personal_expenses(text: str):
+    tokens = _tokens(text)
+    if _has_foreign_cues(tokens, "personal_expense_tracking"):
+        return None
+    # "Mere paas 1000 the" is an opening balance, not an expense (income_and_balance)
+    words = {t.lower() for t in tokens}
+    if "paas" in words and words & {"the", "tha", "thi"}:
+        return None
+    skip = _CONNECTORS | _CURRENCY_WORDS
+    items = []
+    for clause in _clauses(tokens):
+        quantities = _quantities(clause)
+        if not quantities:
+            continue
+        if len(quantities) > 1 or quantities[0]["percent"]:
+            return None
+        quantity = quantities[0]
+        # "bus ke 30 lage" / "sabzi 200 ki" -> the word before; "30 rupaye bus ke lage" -> the word after
+        label = _word_before(clause, quantity["start"], skip)
+        if not label or label in _NON_NAMES or label in _PRONOUNS:
+            label = _word_after(clause, quantity["end"], skip)
+        if not label or label in _NON_NAMES or label in _PRONOUNS:
+            return None
+        items.append((label.capitalize(), quantity["value"]))
+    if len(items) < 2:
+        return None
+
+    total = sum(amount for _, amount in items)
+    heading = "Aapke aaj ke kul kharch is prakaar hain:" if "aaj" in text.lower() else "Aapke kul kharch is prakaar hain:"
+    lines = [heading] + [f"- {label}: {format_inr(amount)}" for label, amount in items]
+    lines.append(f"**Kul Kharch: {format_inr(total)}**")
+    return "\n".join(lines)
+
+_DISCOUNT_WORDS = {"discount", "off", "chhoot", "chhut", "chut", "sale", "offer"}
+_PRICE_WORDS = {"daam", "dam", "price", "keemat", "kimat", "mrp"}
+_NOT_ITEMS = _NON_NAMES | _DISCOUNT_WORDS | _PRICE_WORDS | {"hai", "hain", "tha", "thi", "the", "mil", "milti", "milta"}
+
+def _discount_item(tokens: list, price: dict) -> str:
+    """The item being bought: "shirt sale mein 1000 ki" / "1000 ki shirt"; empty if unclear."""
+    skip = _CONNECTORS | _CURRENCY_WORDS | _DISCOUNT_WORDS | _PRICE_WORDS
+    for word in (_word_before(tokens, price["start"], skip), _word_after(tokens, price["end"], _CONNECTORS | _CURRENCY_WORDS)):
+        if word and word not in _NOT_ITEMS:
+            return word
+    return ""
+
+def solve_discount(text: str):
+    tokens = _tokens(text)
+    if _has_foreign_cues(tokens, "discount_and_offers"):
+        return None
+    words = {t.lower() for t in tokens}
+    if not words & _DISCOUNT_WORDS:
+        return None
+    quantities = _quantities(tokens)
+    prices = [q for q in quantities if not q["percent"]]
+    percents = [q for q in quantities if q["percent"]]
+    if len(prices) != 1 or len(percents) != 1 or not 0 < percents[0]["value"] < 100:
+        return None
+
+    price, percent = prices[0]["value"], percents[0]["value"]
+    discount = price * percent / 100
+    item = _discount_item(tokens, prices[0])
+    price_label = f"{item.capitalize()} ka Daam" if item else "Daam"
+    return "\n".join([
+        "**Discount ka Hisaab:**",
+        f"- **{price_label}:** {format_inr(price)}",
+        f"- **Discount ({_plain(percent)}%):** {format_inr(discount)} ({_plain(price)} ka {_plain(percent)}%)",
+        f"- **Isliye, aapko {format_inr(price - discount)} dene honge.**",
+    ])
+
+_SALARY_UNITS = {"din": "Din", "dino": "Din", "dinon": "Din", "days": "Din", "day": "Din",
+                 "ghante": "Ghante", "ghanta": "Ghante", "ghanton": "Ghante", "hours": "Ghante", "hour": "Ghante",
+                 "hafte": "Hafte", "hafta": "Hafte", "weeks": "Hafte", "week": "Hafte"}
+# Words that give the unit of the rate ("din ke 800", "800 roz"); "mahine" is a monthly rate
+_SALARY_RATE_WORDS = {"din": "Din", "roz": "Din", "rozana": "Din", "dihadi": "Din", "day": "Din",
+                      "ghante": "Ghante", "ghanta": "Ghante", "hour": "Ghante",
+                      "hafte": "Hafte", "hafta": "Hafte", "week": "Hafte",
+                      "mahine": "Mahine", "mahina": "Mahine", "maheene": "Mahine", "month": "Mahine"}
+# Words that make a count itself a rate ("roz 8 ghante" is 8 hours per day, not 8 hours in total)
+_PER_WORDS = {"roz", "rozana", "har", "per", "prati", "daily"}
+# Every word a simple "rate x count" salary story may contain; anything else (chutti, kategi,
+# overtime, bonus...) can change the answer, so the LLM handles it
+_SALARY_VOCABULARY = (set(_SALARY_UNITS) | set(_SALARY_RATE_WORDS) | _PER_WORDS | _CONNECTORS | _CURRENCY_WORDS | {
+    "main", "maine", "mujhe", "mera", "meri", "mere", "hum", "humne", "is", "iss", "kul", "total", "salary", "kamai",
+    "kamaai", "kamata", "kamati", "kamate", "kamaata", "kamaati", "majdoori", "mazdoori", "paise", "rate", "hisaab",
+    "milte", "milta", "milti", "mile", "mila", "mili", "kaam", "kiya", "kiye", "karta", "karti", "karte", "hoon",
+    "hu", "hun", "hai", "hain", "tha", "thi", "the", "kitni", "kitna", "kitne", "hui", "hua", "hue", "hogi", "hoga",
+    "banegi", "bani", "bana", "bataiye", "batao", "to", "toh", "aur", "ab"})
+
+def solve_salary(text: str):
+    tokens = _tokens(text)
+    if _has_foreign_cues(tokens, "salary_calculation"):
+        return None
+    if any(t.isalpha() and t.lower() not in _SALARY_VOCABULARY for t in tokens):
+        return None
+    quantities = _quantities(tokens)
+    if len(quantities) != 2 or any(q["percent"] for q in quantities):
+        return None
+
+    # The count is the number directly followed by a unit ("25 din"); the other one is the rate
+    counts = [q for q in quantities if _word_after(tokens, q["end"]) in _SALARY_UNITS]
+    if len(counts) != 1:
+        return None
+    count = counts[0]
+    rate = next(q for q in quantities if q is not count)
+    unit = _SALARY_UNITS[_word_after(tokens, count["end"])]
+    unit_index = count["end"] + 1
+
+    # Only answer when the rate's own clause states exactly one unit and it is the count's unit
+    rate_clause, count_clause = _clause_span(tokens, rate["start"]), _clause_span(tokens, count["start"])
+    rate_units = {_SALARY_RATE_WORDS[tokens[i].lower()] for i in range(*rate_clause)
+                  if i != unit_index and tokens[i].lower() in _SALARY_RATE_WORDS}
+    if rate_units != {unit}:
+        return None
+    if count_clause != rate_clause and {tokens[i].lower() for i in range(*count_clause)} & _PER_WORDS:
+        return None
+
+    total = rate["value"] * count["value"]
+    period = "is mahine ki salary" if "mahine" in text.lower() else "kul kamai"
+    return "\n".join([
+        "**Salary ka Hisaab:**",
+        f"- **Ek {unit} ki Kamai:** {format_inr(rate['value'])}",
+        f"- **Kul Kaam ke {unit}:** {_plain(count['value'])}",
+        f"- **Isliye, aapki {period} {format_inr(total)} hui ({_plain(rate['value'])} x {_plain(count['value'])}).**",
+    ])
+
+def _months(quantity: dict, tokens: list):
+    unit = _word_after(tokens, quantity["end"])
+    if unit in {"saal", "sal", "varsh", "years", "year", "baras"}:
+        return quantity["value"] * 12
+    if unit in {"mahine", "mahina", "mahino", "months", "month", "maheene"}:
+        return quantity["value"]
+    return None
+
+def solve_loan(text: str):
+    tokens = _tokens(text)
+    if _has_foreign_cues(tokens, "loan_and_emi"):
+        return None
+    quantities = _quantities(tokens)
+    durations = [(q, _months(q, tokens)) for q in quantities if _months(q, tokens)]
+    if len(durations) != 1:
+        return None
+    duration, months = durations[0]
+    # "har mahine" style phrases contain no number, so everything left is money or a rate
+    rest = [q for q in quantities if q is not duration]
+    emis = [q for q in rest if not q["percent"] and {t.lower() for t in tokens[max(0, q["start"] - 3):q["end"] + 4]} & {"emi", "kisht", "qist", "installment"}]
+    rates = [q for q in rest if q["percent"]]
+    principals = [q for q in rest if not q["percent"] and q not in emis]
+    if len(rates) > 1 or len(emis) > 1 or len(principals) > 1:
+        return None
+
+    months_label = _plain(months)
+    if len(emis) == 1 and not rates:
+        emi = emis[0]["value"]
+        total = emi * months
+        # Paying more than the principal means the loan ends early; too ambiguous to answer locally
+        if principals and total > principals[0]["value"]:
+            return None
+        if months % 12 == 0:
+            years = "Ek" if months == 12 else _plain(months / 12)
+            span, span_words = f"{years} Saal ({months_label} Mahine)", f"{years.lower()} saal"
+        else:
+            span, span_words = f"{months_label} Mahine", f"{months_label} mahine"
+        return "\n".join([
+            "**Loan ka Hisaab:**",
+            f"- **Har Mahine ki EMI:** {format_inr(emi)}",
+            f"- **{span} mein Kul Bhugtaan:** {format_inr(total)} ({_plain(emi)} x {months_label})",
+            f"- **Isliye, aap {span_words} mein {format_inr(total)} chuka denge.**",
+        ])
+
+    if not emis and len(rates) == 1 and len(principals) == 1:
+        principal, annual_rate = principals[0]["value"], rates[0]["value"]
+        monthly_rate = annual_rate / 12 / 100
+        if monthly_rate == 0:
+            emi, total = principal / months, principal
+        else:
+            growth = (1 + monthly_rate) ** months
+            emi = principal * monthly_rate * growth / (growth - 1)
+            total = emi * months
+        # Totals come from the exact EMI; only the amounts shown are rounded to whole rupees
+        total = round(total)
+        emi = round(emi)
+        return "\n".join([
+            "**Loan ka Hisaab:**",
+            f"- **Loan Rashi:** {format_inr(principal)}",
+            f"- **Byaaj Dar:** {_plain(annual_rate)}% saalana",
+            f"- **Avadhi:** {months_label} Mahine",
+            f"- **Har Mahine ki EMI:** {format_inr(emi)}",
+            f"- **Kul Bhugtaan:** {format_inr(total)} (Byaaj {format_inr(total - principal)})",
+            f"- **Isliye, aapki EMI {format_inr(emi)} hogi.**",
+        ])
+    return None
+
+def _people_count(tokens: list):
+    for i, token in enumerate(tokens[:-1]):
+        following = tokens[i + 1].lower()
+        if following in _PEOPLE_WORDS:
+            if _is_number(token) and "%" not in token:
+                return int(float(token.lstrip("₹").replace(",", ""))), i
+            if token.lower() in _NUMBER_WORDS:
+                return _NUMBER_WORDS[token.lower()], i
+    return None, None
+
+def _enumerated_names(text: str) -> list:
+    """Names listed as 'main, Rohit aur Suman' (the last item is the one right after 'aur')."""
+    names = []
+    for left, right in re.findall(r"((?:[^\W\d_]+,\s*)*[^\W\d_]+)\s+aur\s+([^\W\d_]+)", text):
+        for name in [n.strip() for n in left.split(",")] + [right]:
+            if name[:1].isupper() and name.lower() not in _NON_NAMES and name.lower() not in _PEOPLE_WORDS:
+                names.append(name)
+    return names
+
+def settle_debts(balances: dict) -> list:
+    """
+    Turns net balances (positive = should receive, negative = should pay) into a short list
+    of (payer, receiver, amount) transfers. Exactly offsetting pairs are settled first, then
+    the largest debtor pays the largest creditor, which needs at most N-1 transfers.
+    """
+    creditors = {p: round(b, 2) for p, b in balances.items() if b > 0.005}
+    debtors = {p: round(-b, 2) for p, b in balances.items() if b < -0.005}
+    transfers = []
+    for debtor, owed in list(debtors.items()):
+        match = next((c for c, amount in creditors.items() if abs(amount - owed) < 0.005), None)
+        if match is not None:
+            transfers.append((debtor, match, owed))
+            del creditors[match], debtors[debtor]
+    while debtors and creditors:
+        debtor = max(debtors, key=debtors.get)
+        creditor = max(creditors, key=creditors.get)
+        amount = min(debtors[debtor], creditors[creditor])
+        transfers.append((debtor, creditor, amount))
+        debtors[debtor] = round(debtors[debtor] - amount, 2)
+        creditors[creditor] = round(creditors[creditor] - amount, 2)
+        if debtors[debtor] < 0.005:
+            del debtors[debtor]
+        if creditors[creditor] < 0.005:
+            del creditors[creditor]
+    return transfers
+
+def solve_group_settlement(text: str):
+    tokens = _tokens(text)
+    if _has_foreign_cues(tokens, "group_settlement"):
+        return None
+    me = "Aap"
+    # The user is always counted as a participant, so the story has to say they were there
+    if not {t.lower() for t in tokens} & _SELF_WORDS:
+        return None
+    people_count, count_index = _people_count(tokens)
+    names = _enumerated_names(text)
+    payers = {t for t, nxt in zip(tokens, tokens[1:]) if nxt.lower() == "ne" and t.lower() not in _PRONOUNS}
+    names += [n for n in sorted(payers) if n not in names]
+    participants = [me] + [n for n in dict.fromkeys(names) if n.lower() not in _NON_NAMES]
+    if people_count is None:
+        people_count = len(participants)
+    if people_count != len(participants) or people_count < 2:
+        return None
+
+    paid = {p: 0.0 for p in participants}
+    labels = []
+    for clause in _clauses(tokens):
+        words = [t.lower() for t in clause]
+        quantities = [q for q in _quantities(clause)
+                      if not (count_index is not None and clause[q["start"]] == tokens[count_index]
+                              and _word_after(clause, q["end"]) in _PEOPLE_WORDS)]
+        if not quantities:
+            continue
+        # "Rohit ne mujhe 200 diye" is a transfer between people, not a shared expense
+        if len(quantities) > 1 or quantities[0]["percent"] or set(words) & _RECIPIENT_WORDS:
+            return None
+        if set(words) & _SELF_PAYER_WORDS or ("main" in words and "ne" in words):
+            payer = me
+        else:
+            subjects = [clause[i] for i in range(len(clause) - 1) if words[i + 1] == "ne" and clause[i] in participants]
+            if len(subjects) != 1:
+                return None
+            payer = subjects[0]
+        amount = quantities[0]["value"]
+        paid[payer] += amount
+        label = _word_before(clause, quantities[0]["start"], _CONNECTORS | _CURRENCY_WORDS)
+        labels.append((amount, label.capitalize() if label and label not in _NON_NAMES and label not in _SELF_PAYER_WORDS else ""))
+
+    total = sum(paid.values())
+    if total <= 0:
+        return None
+    share = total / people_count
+    balances = {p: paid[p] - share for p in participants}
+
+    breakdown = ""
+    if len(labels) > 1 and all(label for _, label in labels):
+        breakdown = " (" + " + ".join(f"₹{_plain(amount)} {label}" for amount, label in labels) + ")"
+    lines = ["**Trip ka Hisaab:**", f"- **Kul Kharch:** {format_inr(total)}{breakdown}",
+             f"- **Log:** {people_count}", f"- **Prati Vyakti Hissa:** {format_inr(share)}", "**Settlement:**"]
+    for person in participants:
+        if balances[person] > 0.005:
+            lines.append(f"- {'Aapne' if person == me else person + ' ne'} {format_inr(balances[person])} extra diye hain.")
+        elif abs(balances[person]) <= 0.005:
+            lines.append(f"- {'Aapne' if person == me else person + ' ne'} apna hissa de diya hai.")
+
+    transfers = settle_debts(balances)
+    for i, (payer, receiver, amount) in enumerate(transfers):
+        receiver_text = "aapko" if receiver == me else f"{receiver} ko"
+        sentence = (f"Aapko {receiver_text} {format_inr(amount)} dene hain." if payer == me
+                    else f"{payer} ko {receiver_text} {format_inr(amount)} dene hain.")
+        prefix = "Isliye, " if i == 0 else ""
+        sentence = prefix + (sentence[0].lower() + sentence[1:] if prefix and payer == me else sentence)
+        lines.append(f"- **{sentence}**")
+    return "\n".join(lines)
+
+SOLVERS = {
+    "personal_expense_tracking": solve_personal_expenses,
+    "group_settlement": solve_group_settlement,
+    "discount_and_offers": solve_discount,
+    "salary_calculation": solve_salary,
+    "loan_and_emi": solve_loan,
+}
+
+def solve(user_story: str, category: str):
+    """
+    Computes the answer locally for arithmetic categories.
+
+    Returns:
+        The formatted answer, or None if the category is not supported or the story could not
+        be parsed confidently (the caller should then use the LLM).
+    """
+    solver = SOLVERS.get(category)
+    if solver is None or not user_story:
+        return None
+    try:
+        return solver(user_story)
+    except (ValueError, ZeroDivisionError, OverflowError, IndexError, StopIteration):
+        return None
@@ -0,0 +1,284 @@
+# llm_client.py - Shared LLM Client Layer
+#
+# Every Gemini call in the app goes through one process-wide LLMClient:
+#   - genai is configured once and GenerativeModel objects are cached per model name, so the
+#     underlying HTTP/gRPC channel is reused instead of rebuilt on every request.
+#   - Each call gets a timeout, retries rate-limit/transient errors with exponential backoff
+#     plus jitter, and waits on a semaphore so at most HISSAB_LLM_MAX_CONCURRENCY requests are
+#     in flight (per API: one limit for threads, one per asyncio event loop). Waiting for a slot
+#     is bounded by HISSAB_LLM_QUEUE_TIMEOUT_SECONDS; after that the call fails with LLMBusyError
+#     instead of blocking the session forever.
+#   - Sync (generate/stream) and async (agenerate/astream) APIs. The app and batch.py use the
+#     sync API: Streamlit's write_stream consumes a plain generator and its script threads have
+#     no event loop. The async API is for async hosts (e.g. an ASGI front end) sharing the client.
+#
+# Backends (HISSAB_LLM_BACKEND):
+#   "gemini" - Google Gemini via google.generativeai (needs GOOGLE_API_KEY).
+#   "fake"   - Offline canned responses with configurable latency, for tests and benchmarks.
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+LLM_BACKEND = os.getenv("HISSAB_LLM_BACKEND", "gemini")
+LLM_MODEL_NAME = os.getenv("HISSAB_LLM_MODEL", "gemini-1.5-flash")
+LLM_TIMEOUT_SECONDS = float(os.getenv("HISSAB_LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("HISSAB_LLM_MAX_RETRIES", "3"))
+LLM_MAX_CONCURRENCY = int(os.getenv("HISSAB_LLM_MAX_CONCURRENCY", "8"))
+# How long a call may wait for a free concurrency slot before giving up
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("HISSAB_LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+# Simulated latency of the fake backend, per streamed chunk
+FAKE_LLM_LATENCY_MS = float(os.getenv("HISSAB_FAKE_LLM_LATENCY_MS", "0"))
+
+# Exceptions (by class name) that mean "slow down and try again" rather than a hard failure
+RETRYABLE_ERRORS = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+                    "InternalServerError", "TimeoutError"}
+
+def is_retryable(error: Exception) -> bool:
+    return type(error).__name__ in RETRYABLE_ERRORS or "429" in str(error)
+
+def _backoff_delay(attempt: int, base_delay: float) -> float:
+    return base_delay * (2 ** attempt) * (1 + random.random())
+
+class LLMBusyError(Exception):
+    """No concurrency slot became free within the queue timeout; not retried."""
+
+def _chunk_text(chunk) -> str:
+    return chunk.text if hasattr(chunk, "text") and chunk.text else ""
+
+class GeminiBackend:
+    """
+    google.generativeai, configured once; model objects are cached and shared. genai keeps its
+    configuration globally, so a process talks to Gemini with a single API key.
+    """
+    name = "gemini"
+
+    def __init__(self, api_key: str):
+        if not api_key:
+            raise ValueError("Error: Google API Key missing.")
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self._genai = genai
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model(self, model_name: str):
+        with self._lock:
+            if model_name not in self._models:
+                self._models[model_name] = self._genai.GenerativeModel(model_name)
+            return self._models[model_name]
+
+    def generate(self, prompt: str, model_name: str, timeout: float) -> str:
+        response = self.model(model_name).generate_content(prompt, request_options={"timeout": timeout})
+        return response.text if response and hasattr(response, "text") else ""
+
+    def stream(self, prompt: str, model_name: str, timeout: float):
+        response = self.model(model_name).generate_content(prompt, stream=True, request_options={"timeout": timeout})
+        for chunk in response:
+            text = _chunk_text(chunk)
+            if text:
+                yield text
+
+    async def agenerate(self, prompt: str, model_name: str, timeout: float) -> str:
+        response = await self.model(model_name).generate_content_async(prompt, request_options={"timeout": timeout})
+        return response.text if response and hasattr(response, "text") else ""
+
+    async def astream(self, prompt: str, model_name: str, timeout: float):
+        response = await self.model(model_name).generate_content_async(
+            prompt, stream=True, request_options={"timeout": timeout})
+        async for chunk in response:
+            text = _chunk_text(chunk)
+            if text:
+                yield text
+
+class ResourceExhausted(Exception):
+    """Raised by FakeBackend to simulate a 429 (same class name as the Google API error)."""
+
+class FakeBackend:
+    """
+    Offline backend. `responder(prompt)` produces the answer (default: a fixed settled-hisaab
+    reply), streamed word by word with `latency_ms` per chunk. The first `failures` calls raise
+    ResourceExhausted, which exercises the retry path.
+    """
+    name = "fake"
+
+    def __init__(self, responder=None, latency_ms: float = FAKE_LLM_LATENCY_MS, failures: int = 0):
+        self.responder = responder or (lambda prompt: "**Hisaab:**\n- Sab hisaab barabar hai.\n- **Isliye, kisi ko kuch nahi dena hai.**")
+        self.latency_ms = latency_ms
+        self.failures = failures
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _start(self, prompt: str) -> list:
+        with self._lock:
+            self.calls += 1
+            if self.failures > 0:
+                self.failures -= 1
+                raise ResourceExhausted("429 fake rate limit")
+        return [w + " " for w in self.responder(prompt).split(" ")]
+
+    def generate(self, prompt: str, model_name: str, timeout: float) -> str:
+        chunks = self._start(prompt)
+        time.sleep(self.latency_ms * len(chunks) / 1000)
+        return "".join(chunks).rstrip(" ")
+
+    def stream(self, prompt: str, model_name: str, timeout: float):
+        chunks = self._start(prompt)
+        for i, chunk in enumerate(chunks):
+            time.sleep(self.latency_ms / 1000)
+            yield chunk if i < len(chunks) - 1 else chunk.rstrip(" ")
+
+    async def agenerate(self, prompt: str, model_name: str, timeout: float) -> str:
+        chunks = self._start(prompt)
+        await asyncio.sleep(self.latency_ms * len(chunks) / 1000)
+        return "".join(chunks).rstrip(" ")
+
+    async def astream(self, prompt: str, model_name: str, timeout: float):
+        chunks = self._start(prompt)
+        for i, chunk in enumerate(chunks):
+            await asyncio.sleep(self.latency_ms / 1000)
+            yield chunk if i < len(chunks) - 1 else chunk.rstrip(" ")
+
+class LLMClient:
+    """
+    Timeouts, retries and concurrency limits around a backend. Streams are only retried
+    before their first chunk; once text has reached the caller, an error is raised instead
+    of replaying a partial answer.
+    """
+
+    def __init__(self, backend, model_name: str = LLM_MODEL_NAME, timeout: float = LLM_TIMEOUT_SECONDS,
+                 max_retries: int = LLM_MAX_RETRIES, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 base_delay: float = 1.0, queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS):
+        self.backend = backend
+        self.model_name = model_name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.base_delay = base_delay
+        self.queue_timeout = queue_timeout
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        # asyncio semaphores belong to one event loop, so keep one per loop
+        self._async_semaphores = weakref.WeakKeyDictionary()
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_semaphores:
+            self._async_semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._async_semaphores[loop]
+
+    def _acquire(self):
+        if not self._semaphore.acquire(timeout=self.queue_timeout):
+            raise LLMBusyError(f"No LLM slot free after {self.queue_timeout:g}s ({self.max_concurrency} requests in flight)")
+
+    async def _aacquire(self) -> asyncio.Semaphore:
+        semaphore = self._async_semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise LLMBusyError(f"No LLM slot free after {self.queue_timeout:g}s ({self.max_concurrency} requests in flight)") from None
+        return semaphore
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        if attempt == self.max_retries or not is_retryable(error):
+            return False
+        print(f"Rate limit/transient error ({type(error).__name__}), dobara koshish ki ja rahi hai...")
+        return True
+
+    def generate(self, prompt: str, timeout: float = None, model_name: str = None) -> str:
+        """Returns the full response text for `prompt`."""
+        for attempt in range(self.max_retries + 1):
+            self._acquire()
+            try:
+                return self.backend.generate(prompt, model_name or self.model_name, timeout or self.timeout)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+            finally:
+                self._semaphore.release()
+            time.sleep(_backoff_delay(attempt, self.base_delay))
+
+    def stream(self, prompt: str, timeout: float = None, model_name: str = None):
+        """
+        Yields the response text chunk by chunk, holding a concurrency slot until done. The
+        slot is released when the stream ends, fails, or is closed early by the caller.
+        """
+        for attempt in range(self.max_retries + 1):
+            started = False
+            self._acquire()
+            chunks = None
+            try:
+                chunks = self.backend.stream(prompt, model_name or self.model_name, timeout or self.timeout)
+                for text in chunks:
+                    started = True
+                    yield text
+                return
+            except Exception as e:
+                if started or not self._should_retry(e, attempt):
+                    raise
+            finally:
+                if hasattr(chunks, "close"):
+                    chunks.close()
+                self._semaphore.release()
+            time.sleep(_backoff_delay(attempt, self.base_delay))
+
+    async def agenerate(self, prompt: str, timeout: float = None, model_name: str = None) -> str:
+        """Async version of generate(); the timeout also bounds the whole call."""
+        timeout = timeout or self.timeout
+        for attempt in range(self.max_retries + 1):
+            semaphore = await self._aacquire()
+            try:
+                return await asyncio.wait_for(self.backend.agenerate(prompt, model_name or self.model_name, timeout), timeout)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+            finally:
+                semaphore.release()
+            await asyncio.sleep(_backoff_delay(attempt, self.base_delay))
+
+    async def astream(self, prompt: str, timeout: float = None, model_name: str = None):
+        """Async version of stream(); `timeout` bounds the wait for each chunk."""
+        timeout = timeout or self.timeout
+        for attempt in range(self.max_retries + 1):
+            started = False
+            semaphore = await self._aacquire()
+            try:
+                chunks = self.backend.astream(prompt, model_name or self.model_name, timeout).__aiter__()
+                while True:
+                    try:
+                        text = await asyncio.wait_for(chunks.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        return
+                    started = True
+                    yield text
+            except Exception as e:
+                if started or not self._should_retry(e, attempt):
+                    raise
+            finally:
+                semaphore.release()
+            await asyncio.sleep(_backoff_delay(attempt, self.base_delay))
+
+LLM_BACKENDS = {"gemini": GeminiBackend, "fake": FakeBackend}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_llm_client(api_key: str = None, backend: str = None) -> LLMClient:
+    """
+    Returns the process-wide client for `backend` (default: HISSAB_LLM_BACKEND). The Gemini
+    backend uses `api_key`, or GOOGLE_API_KEY when none is given.
+    """
+    backend = backend or LLM_BACKEND
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {backend} (choose from {', '.join(LLM_BACKENDS)})")
+    if backend == "gemini":
+        api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        key = (backend, api_key)
+    else:
+        key = (backend, None)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = LLMClient(GeminiBackend(api_key) if backend == "gemini" else FakeBackend())
+        return _clients[key]
@@ -1,20 +1,40 @@
 # main.py - Core Logic Engine (Refactored for RAG and Vector DB)
 import os
-import uuid
-import google.generativeai as genai
-from gtts import gTTS
+import re
+import time
 from dotenv import load_dotenv
 
 # Import functions from the new RAG and VectorDB modules
 from rag import get_enhanced_prompt
-from vectordb import add_user_prompt_to_db, setup_vector_db
+from vectordb import (QueryContext, add_user_prompt_to_db, budget_violations, ensure_vector_db,
+                      start_background_warmup, warm_up, write_queue_metrics)
+from response_cache import ResponseCache, replay_stream
+from hisaab_calc import solve as solve_locally
+import tracing
+import tts
+from llm_client import LLM_BACKEND, LLMBusyError, get_llm_client
 
 # Load environment variables from .env file
 load_dotenv()
 
-# One-time setup for the vector database
-# This will initialize the DB and populate it with initial examples if it's empty.
-setup_vector_db()
+# The vector DB and embedding model are loaded lazily, once per process, on the first query.
+# Call warm_up() / start_background_warmup() to pre-load them earlier (app2.py does this in the
+# background); HISSAB_EAGER_LOAD=1 restores the old load-at-import behaviour.
+if os.getenv("HISSAB_EAGER_LOAD") == "1":
+    warm_up()
+
+# Cache of finished responses, persisted next to the vector DB (see response_cache.py)
+response_cache = ResponseCache(
+    path=os.getenv("HISSAB_CACHE_PATH", "hissab_response_cache.pkl"),
+    max_entries=int(os.getenv("HISSAB_CACHE_MAX_ENTRIES", "1000")),
+    ttl_seconds=float(os.getenv("HISSAB_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    similarity_threshold=float(os.getenv("HISSAB_CACHE_SIMILARITY", "0.97")),
+    save_interval_seconds=float(os.getenv("HISSAB_CACHE_SAVE_SECONDS", "30")),
+)
+response_cache.load()
+
+# Answer plain-arithmetic categories with the local engine (hisaab_calc.py) when it is confident
+LOCAL_CALC_ENABLED = os.getenv("HISSAB_LOCAL_CALC", "1") != "0"
 
 # This prompt remains as it's for the final audio summary, not the main calculation.
 PROMPT_SUMMARY = """
@@ -26,91 +46,186 @@ Detailed Text: "Trip ka Hisaab: ... Ravi ko aapko ₹200 aur dene hain."
 Your Summary: "Hisaab ke anusaar, Ravi ko aapko ₹200 aur dene hain."
 """
 
-def process_query_stream(api_key: str, user_story: str):
+def process_query_stream(api_key: str, user_story: str, user_id: str = None):
     """
     Processes the user's query using a RAG-enhanced prompt and streams the response.
-    Saves the user's prompt to the vector database for continuous learning.
+    Repeated (or near-identical) stories are answered from the response cache, and plain
+    arithmetic stories by the local engine, instead of the LLM.
+    Saves the user's prompt to the vector database for continuous learning; with a `user_id`
+    it goes to that user's own history, which later retrievals for the same user search too.
+
+    The generator's return value says how the query ended: one of ANSWERED_PATHS ("cache",
+    "local", "llm") for an answer, else "error", "busy" or "empty". Callers that need it (e.g.
+    AudioSummaryJob) read it instead of guessing from the text.
     """
-    if not api_key:
+    if not api_key and LLM_BACKEND != "fake":
         yield "❌ Error: Google API Key missing. Please set the GOOGLE_API_KEY environment variable."
-        return
+        return "error"
     
     if not user_story:
         yield "⚠️ Kripya apni kahani likhein ya bolein."
-        return
+        return "empty"
+
+    # Per-request context: the query is encoded and classified once and reused everywhere below.
+    # Its trace collects the per-stage timings and is logged when the request ends.
+    context = QueryContext(user_story, user_id=user_id, trace=tracing.Trace("query"))
+    path = "error"
 
     try:
-        # 1. Get the dynamically generated, few-shot prompt from the RAG module.
-        # This module will find relevant examples from the vector DB.
-        enhanced_prompt = get_enhanced_prompt(user_story)
-
-        # 2. Configure the generative model and get the response.
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response_stream = model.generate_content(enhanced_prompt, stream=True)
-
-        # 3. Stream the response back to the user interface.
-        full_response_text = ""
-        for chunk in response_stream:
-            if hasattr(chunk, "text") and chunk.text:
-                full_response_text += chunk.text
-                yield chunk.text
+        ensure_vector_db()
+
+        # 0. Serve repeated stories straight from the cache, without calling the LLM.
+        cached_response = response_cache.get(user_story, context.get_embedding())
+        if cached_response is not None:
+            path = "cache"
+            yield from replay_stream(cached_response)
+            return path
+
+        # 1. Plain arithmetic (settlements, totals, discounts, salary, EMI) is computed locally
+        # when the story parses cleanly; everything else goes to the LLM.
+        local_answer = solve_locally(user_story, context.get_category()) if LOCAL_CALC_ENABLED else None
+        if local_answer:
+            path = "local"
+            full_response_text = local_answer
+            yield from replay_stream(local_answer)
+        else:
+            # 2. Get the dynamically generated, few-shot prompt from the RAG module.
+            # This module will find relevant examples from the vector DB.
+            enhanced_prompt = get_enhanced_prompt(user_story, context=context)
+
+            # 3. Stream the response from the shared LLM client back to the user interface.
+            path = "llm"
+            full_response_text = ""
+            generation_start = time.perf_counter()
+            for text in get_llm_client(api_key).stream(enhanced_prompt):
+                if not full_response_text:
+                    context.trace.record("ttft", (time.perf_counter() - generation_start) * 1000)
+                full_response_text += text
+                yield text
+            context.trace.record("generation", (time.perf_counter() - generation_start) * 1000)
         
-        # 4. After a successful response, save the user's original prompt to the Vector DB.
+        # 5. After a successful response, save the user's original prompt to the Vector DB.
         # This helps the system get smarter over time.
         if full_response_text:
-            add_user_prompt_to_db(user_story)
+            add_user_prompt_to_db(user_story, context=context, model_response=full_response_text)
+            response_cache.put(user_story, context.get_embedding(), full_response_text)
 
+    except LLMBusyError:
+        path = "busy"
+        yield "⚠️ Abhi bahut saare hisaab ek saath chal rahe hain, thodi der baad dobara koshish kijiye."
     except Exception as e:
+        path = "error"
         yield f"⚠️ Hisaab lagate samay error aaya: {e}"
+    finally:
+        context.trace.finish(path=path, category=context.category, prompt_tokens=context.prompt_tokens,
+                             prompt_examples=context.prompt_examples, within_budget=context.check_budget())
+    return path
+
+# Return values of process_query_stream that mean the user got a real answer
+ANSWERED_PATHS = ("cache", "local", "llm")
+
+def metrics_snapshot() -> dict:
+    """Per-stage latency percentiles plus response-cache, write-queue and query-budget stats, for dashboards/logs."""
+    return {"stages": tracing.metrics_snapshot(), "response_cache": response_cache.stats(),
+            "write_queue": write_queue_metrics(), "budget_violations": budget_violations()}
 
 # ---------------------------
-# Generate Audio Summary (No changes needed here)
+# Audio Summary (derived locally, synthesized in the background)
 # ---------------------------
-def generate_audio_summary(api_key: str, detailed_text: str, slow: bool = False, lang: str = "hi"):
+FALLBACK_SUMMARY = "Hisaab taiyaar hai."
+
+def extract_summary(detailed_text: str, allow_total: bool = True):
     """
-    Generates a short audio summary from the detailed text output.
+    Builds the spoken summary straight from the answer text. Calculations end with an
+    "Isliye, ..." conclusion, which is exactly what the summary model used to paraphrase, so
+    no second Gemini call is needed. Plain expense lists only have a "Kul Kharch" total, used
+    when `allow_total` is set. Returns None if neither is found.
+    """
+    lines = [line.replace("**", "").strip().lstrip("-*• ").strip() for line in detailed_text.splitlines()]
+    for clean in lines:
+        match = re.match(r"isliye,?\s*(.+)", clean, re.IGNORECASE)
+        if match:
+            return f"Hisaab ke anusaar, {match.group(1).strip()}"
+    if allow_total:
+        for clean in reversed(lines):
+            match = re.match(r"kul kharch\s*:\s*(₹[\d,]+)", clean, re.IGNORECASE)
+            if match:
+                return f"Hisaab ke anusaar, aapka kul kharch {match.group(1)} hai."
+    return None
+
+def _summary_from_llm(api_key: str, detailed_text: str) -> str:
+    full_request = PROMPT_SUMMARY + f"\nDetailed Text: \"{detailed_text}\""
+    return get_llm_client(api_key).generate(full_request).strip() or FALLBACK_SUMMARY
+
+def generate_audio_summary(api_key: str, detailed_text: str, slow: bool = False, lang: str = None):
+    """
+    Generates a short audio summary from the detailed text output. The summary sentence is
+    extracted locally when possible; the MP3 comes from the TTS cache when it was spoken before.
+    Without `lang` the voice matches the summary's script (see tts.voice_for).
     """
-    if not api_key:
-        print("Audio Gen Error: Google API Key missing.")
-        return None
-
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        full_request = PROMPT_SUMMARY + f"\nDetailed Text: \"{detailed_text}\""
-
-        response = model.generate_content(full_request)
-        audio_text = response.text.strip() if response and hasattr(response, "text") else "Hisaab taiyaar hai."
-
-        # Generate a unique filename to avoid browser caching issues
-        audio_file_path = f"response_{uuid.uuid4().hex}.mp3"
-
-        # Generate audio using gTTS
-        tts = gTTS(text=audio_text, lang=lang, slow=slow)
-        tts.save(audio_file_path)
-
-        # Clean up older audio files to save space
-        cleanup_old_audio_files(keep=3)
-
-        return audio_file_path
+        audio_text = extract_summary(detailed_text)
+        if audio_text is None:
+            if not api_key and LLM_BACKEND != "fake":
+                print("Audio Gen Error: Google API Key missing.")
+                audio_text = FALLBACK_SUMMARY
+            else:
+                audio_text = _summary_from_llm(api_key, detailed_text)
+        return tts.synthesize(audio_text, lang=lang, slow=slow)
 
     except Exception as e:
         print(f"Audio summary generate karte samay error aaya: {e}")
         return None
 
-# ---------------------------
-# Helper: Cleanup old audio files (No changes needed here)
-# ---------------------------
-def cleanup_old_audio_files(keep=3):
+class AudioSummaryJob:
     """
-    Deletes older audio files, keeping only the most recent ones.
+    Wraps the response stream and starts TTS in the background as soon as the concluding
+    line has streamed, so the audio is usually ready by the time the text finishes rendering.
+    If the stream's return value (see process_query_stream) says the query was not answered,
+    there is no summary; `status` holds that value once the stream is done.
+
+        job = AudioSummaryJob(api_key)
+        detailed_text = st.write_stream(job.watch(main.process_query_stream(api_key, story)))
+        audio_file = job.result(timeout=60)
     """
-    try:
-        files = [f for f in os.listdir('.') if f.startswith("response_") and f.endswith(".mp3")]
-        files.sort(key=os.path.getmtime, reverse=True)
-        
-        for f in files[keep:]:
-            os.remove(f)
-    except Exception as e:
-        print(f"Purani audio files delete karte samay error aaya: {e}")
\ No newline at end of file
+
+    def __init__(self, api_key: str, slow: bool = False, lang: str = None):
+        self.api_key = api_key
+        self.slow = slow
+        self.lang = lang
+        self.status = None
+        self._future = None
+
+    def watch(self, stream):
+        text = ""
+        stream = iter(stream)
+        while True:
+            try:
+                chunk = next(stream)
+            except StopIteration as done:
+                self.status = done.value
+                break
+            text += chunk
+            yield chunk
+            if self._future is None and "\n" in chunk:
+                # Only complete lines count, and only a conclusion: a "Kul Kharch" line can
+                # stream before the settlement it belongs to
+                summary = extract_summary(text[:text.rfind("\n")], allow_total=False)
+                if summary:
+                    self._future = tts.synthesize_async(summary, lang=self.lang, slow=self.slow)
+        # Plain iterables return None; generators from process_query_stream report their path
+        if self.status is not None and self.status not in ANSWERED_PATHS:
+            # An early "Isliye" line may have been part of an answer that then failed
+            self._future = None
+        elif self._future is None and text.strip():
+            self._future = tts.submit(generate_audio_summary, self.api_key, text, self.slow, self.lang)
+
+    def result(self, timeout: float = None):
+        """Path of the summary MP3 once synthesized, or None if there is none."""
+        if self._future is None:
+            return None
+        try:
+            return self._future.result(timeout=timeout)
+        except Exception as e:
+            print(f"Audio summary generate karte samay error aaya: {e}")
+            return None
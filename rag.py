@@ -5,57 +5,142 @@
 # This module acts as the bridge between the user's raw query and the powerful LLM.
 # It uses the vector database to find relevant examples and then constructs a high-quality
 # "few-shot" prompt to guide the LLM towards the desired output format and style.
+#
+# Prompt assembly is token-budgeted: learned rows without a response and near-duplicate
+# examples are dropped, and the remaining candidates are packed into HISSAB_PROMPT_TOKEN_BUDGET
+# by similarity per token. Templates are compiled once at import time.
 
-from vectordb import get_category_from_prompt, find_similar_prompts
+import math
+import os
+from string import Template
 
-def get_enhanced_prompt(user_story: str) -> str:
+import tracing
+from response_cache import normalize_text
+from vectordb import QueryContext, find_similar_prompts
+
+# Upper bound on the whole prompt (instructions + examples + user story), in estimated tokens
+PROMPT_TOKEN_BUDGET = int(os.getenv("HISSAB_PROMPT_TOKEN_BUDGET", "1200"))
+PROMPT_MAX_EXAMPLES = int(os.getenv("HISSAB_PROMPT_MAX_EXAMPLES", "3"))
+# How many neighbours to fetch before filtering; learned rows without a response are common
+PROMPT_CANDIDATES = int(os.getenv("HISSAB_PROMPT_CANDIDATES", "10"))
+# Examples whose user texts share at least this fraction of words count as duplicates
+PROMPT_DEDUP_OVERLAP = float(os.getenv("HISSAB_PROMPT_DEDUP_OVERLAP", "0.8"))
+
+# --- Prompt Templates (compiled once) ---
+PROMPT_TEMPLATE = Template("""You are an expert financial assistant. Your primary task is to analyze a user's story in Hinglish and provide a clear, step-by-step financial summary in Hindi. Please use the user's currency and values accurately.
+
+${examples}Now, analyze the following user's story and provide the financial summary in the same way.
+
+--- FINAL TASK ---
+User Text: "${user_story}"
+Your Response:
+""")
+
+EXAMPLES_HEADER = "Use the following examples to understand the required format and calculation style.\n\n"
+
+EXAMPLE_TEMPLATE = Template("""--- EXAMPLE ${number} ---
+User Text: "${user_text}"
+Your Response:
+${model_response}
+--- END EXAMPLE ${number} ---
+
+""")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap, offline token estimate (about 4 characters per token for Gemini on Latin-script
+    text). Good enough for budgeting and for tracking input size per request.
+    """
+    return math.ceil(len(text) / 4)
+
+def _render_example(number: int, example: dict) -> str:
+    return EXAMPLE_TEMPLATE.substitute(number=number, user_text=example['user_text'],
+                                       model_response=example['model_response'])
+
+def _word_overlap(a: set, b: set) -> float:
+    return len(a & b) / max(min(len(a), len(b)), 1)
+
+def _usable_examples(candidates: list) -> list:
+    """Drops examples without a response and near-duplicates of a more similar example."""
+    kept, kept_words = [], []
+    for example in candidates:
+        if not (example.get('model_response') or "").strip():
+            continue
+        words = set(normalize_text(example['user_text']).split())
+        if any(_word_overlap(words, other) >= PROMPT_DEDUP_OVERLAP for other in kept_words):
+            continue
+        kept.append(example)
+        kept_words.append(words)
+    return kept
+
+def select_examples(candidates: list, token_budget: int, max_examples: int = PROMPT_MAX_EXAMPLES) -> list:
+    """
+    Picks examples (best first in the result) that fit in `token_budget`. The most similar
+    example is taken first if it fits; the rest are packed greedily by similarity per token,
+    so one long example cannot crowd out two short, nearly as relevant ones.
+    """
+    usable = _usable_examples(candidates)
+    if not usable or max_examples <= 0:
+        return []
+    costs = [estimate_tokens(_render_example(0, example)) for example in usable]
+
+    chosen, remaining = [], token_budget - estimate_tokens(EXAMPLES_HEADER)
+    if costs[0] <= remaining:
+        chosen.append(0)
+        remaining -= costs[0]
+    by_value = sorted(range(1, len(usable)), key=lambda i: max(usable[i].get('similarity', 0.0), 0.0) / costs[i], reverse=True)
+    for i in by_value:
+        if len(chosen) >= max_examples:
+            break
+        if costs[i] <= remaining:
+            chosen.append(i)
+            remaining -= costs[i]
+    return [usable[i] for i in sorted(chosen)]
+
+def get_enhanced_prompt(user_story: str, context: QueryContext = None, token_budget: int = PROMPT_TOKEN_BUDGET) -> str:
     """
     Creates a RAG-enhanced prompt for the LLM.
 
     This is the core of the RAG system. It performs a 3-step process:
     1.  **Classify**: Determines the category of the user's query (e.g., 'group_settlement').
-    2.  **Retrieve**: Fetches the top 3 most relevant examples from that category in the vector DB.
+    2.  **Retrieve**: Fetches the most relevant examples from that category in the vector DB.
     3.  **Generate**: Constructs a new, detailed prompt that includes these examples, guiding
         the LLM to produce a precise and correctly formatted response.
 
     Args:
         user_story: The raw query from the user in Hinglish.
+        context: Per-request context. The embedding and category computed here are cached on it
+            so that the caller can reuse them (e.g. for the DB write) without recomputing. The
+            prompt's estimated token count and example count are recorded on it as well.
+        token_budget: Maximum estimated tokens for the whole prompt.
 
     Returns:
         A string containing the full, enhanced few-shot prompt ready for the LLM.
     """
     # Step 1: User prompt ki category pata karo.
     # Hum 'vectordb' module ka istemal karke user ke prompt ko classify karte hain.
-    category = get_category_from_prompt(user_story)
+    if context is None:
+        context = QueryContext(user_story)
+    category = context.get_category()
     print(f"✅ Identified Category: '{category}'")
 
-    # Step 2: Uss category se 3 sabse milte-julte (semantic) examples nikalo.
+    # Step 2: Uss category se sabse milte-julte (semantic) examples nikalo.
     # Yeh examples LLM ko sahi format mein jawab dene ke liye guide karenge.
-    similar_examples = find_similar_prompts(user_story, category, top_k=3)
-    print(f"✅ Retrieved {len(similar_examples)} similar examples.")
-
-    # Step 3: LLM ke liye final prompt taiyaar karo.
-    
-    # Yeh hamara base instruction hai jo LLM ko batata hai ki use kya karna hai.
-    final_prompt = """You are an expert financial assistant. Your primary task is to analyze a user's story in Hinglish and provide a clear, step-by-step financial summary in Hindi. Please use the user's currency and values accurately.
-
-"""
-
-    # Agar humein relevant examples mile hain, to unhe prompt mein jodo.
-    if similar_examples:
-        final_prompt += "Use the following examples to understand the required format and calculation style.\n\n"
-        
-        # Har example ko ek saaf format mein prompt mein add karo.
-        for i, example in enumerate(similar_examples, 1):
-            final_prompt += f"--- EXAMPLE {i} ---\n"
-            final_prompt += f"User Text: \"{example['user_text']}\"\n"
-            final_prompt += f"Your Response:\n{example['model_response']}\n"
-            final_prompt += f"--- END EXAMPLE {i} ---\n\n"
-
-    # Examples ke baad, LLM ko user ka actual sawaal do.
-    final_prompt += "Now, analyze the following user's story and provide the financial summary in the same way.\n\n"
-    final_prompt += "--- FINAL TASK ---\n"
-    final_prompt += f"User Text: \"{user_story}\"\n"
-    final_prompt += "Your Response:\n"
-
-    return final_prompt
\ No newline at end of file
+    candidates = find_similar_prompts(user_story, category, top_k=PROMPT_CANDIDATES, context=context)
+
+    # Step 3: LLM ke liye final prompt taiyaar karo, token budget ke andar.
+    with tracing.span("prompt_assembly", context.trace):
+        base_tokens = estimate_tokens(PROMPT_TEMPLATE.substitute(examples="", user_story=user_story))
+        similar_examples = select_examples(candidates, token_budget - base_tokens)
+
+        examples = ""
+        if similar_examples:
+            examples = EXAMPLES_HEADER + "".join(
+                _render_example(i, example) for i, example in enumerate(similar_examples, 1))
+        final_prompt = PROMPT_TEMPLATE.substitute(examples=examples, user_story=user_story)
+    print(f"✅ Retrieved {len(candidates)} candidates, using {len(similar_examples)} examples.")
+
+    context.prompt_tokens = estimate_tokens(final_prompt)
+    context.prompt_examples = len(similar_examples)
+    print(f"✅ Prompt size: ~{context.prompt_tokens} tokens ({len(similar_examples)} examples).")
+    return final_prompt
@@ -0,0 +1,233 @@
+# response_cache.py - Semantic Response Cache in front of Gemini Generation
+#
+# Many users send near-identical stories (same split, same numbers). Instead of generating
+# a fresh answer every time, finished responses are cached and replayed:
+#   - Exact hit:    the normalized story text has been answered before.
+#   - Semantic hit: a cached story is at least `similarity_threshold` cosine-similar AND has
+#                   exactly the same extracted numbers (so "3 dost, 6000" never matches
+#                   "4 dost, 6000") AND the same key terms: names/parties in order and
+#                   direction words (so "Rohit ne Suman ko 500 diye" never matches
+#                   "Suman ne Rohit ko 500 diye" or "Rohit se 500 liye").
+# Entries are evicted LRU once `max_entries` is reached and expire after `ttl_seconds`.
+# The cache is persisted next to the vector DB so it survives restarts. Saving happens on a
+# background timer (at most every `save_interval_seconds`) and at exit, never on the request.
+
+import atexit
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from vector_index import normalize
+
+# Number words that change the value of the number in front of them
+_MULTIPLIERS = {"k": 1_000, "hazaar": 1_000, "hazar": 1_000, "hajar": 1_000, "thousand": 1_000,
+                "lakh": 100_000, "lac": 100_000, "lakhs": 100_000, "crore": 10_000_000, "cr": 10_000_000}
+_NUMBER_PATTERN = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(%|[a-z]+)?", re.IGNORECASE)
+_WORD_PATTERN = re.compile(r"[^\W_]+")
+# Postpositions that mark who did what to whom; the word in front of them is a party
+_ROLE_MARKERS = {"ne", "ko", "se", "ka", "ki", "ke"}
+# Words that decide which way money moved (or whether it is still left)
+_DIRECTION_WORDS = {"diya", "diye", "di", "dena", "dene", "deni", "liya", "liye", "li", "lena", "lene",
+                    "leni", "mila", "mile", "mili", "udhaar", "udhar", "wapas", "vaapas", "lautaye", "lautaya",
+                    "chukaye", "chukaya", "bache", "bacha", "bachi", "baki", "baaki", "jama", "kharch", "kharcha"}
+# "300 diye" and "300 nahi diye" embed almost identically; spellings map to one term
+_NEGATION_WORDS = {"nahi": "nahi", "nahin": "nahi", "nhi": "nahi", "nai": "nahi", "na": "nahi", "mat": "nahi"}
+_NON_PARTIES = {"main", "maine", "mainne", "mene", "hum", "humne", "mujhe", "hume", "aaj", "kal", "har", "is", "us"}
+
+def normalize_text(text: str) -> str:
+    """Lowercases, strips punctuation and collapses whitespace so trivial edits still hit."""
+    text = re.sub(r"[^\w\s%.]", " ", text.lower())
+    return " ".join(text.replace(". ", " ").split()).rstrip(".")
+
+def extract_numbers(text: str) -> tuple:
+    """Returns every number in the story (with lakh/hazaar/% applied), in order of appearance."""
+    numbers = []
+    for digits, suffix in _NUMBER_PATTERN.findall(text):
+        value = float(digits.replace(",", ""))
+        suffix = suffix.lower()
+        if suffix == "%":
+            numbers.append(f"{value:g}%")
+        else:
+            numbers.append(f"{value * _MULTIPLIERS.get(suffix, 1):g}")
+    return tuple(numbers)
+
+def extract_key_terms(text: str) -> tuple:
+    """
+    Returns the words a semantic hit must agree on, in order of appearance: names and parties
+    (capitalized words, and the word in front of ne/ko/se/ka/ki/ke, so lowercase STT output
+    is covered too), direction words (diye/liye/udhaar/bache...) and negations (nahi/na/mat).
+    """
+    words = _WORD_PATTERN.findall(text)
+    terms = []
+    for i, word in enumerate(words):
+        lower = word.lower()
+        following = words[i + 1].lower() if i + 1 < len(words) else ""
+        if lower[0].isdigit():
+            continue
+        if lower in _DIRECTION_WORDS:
+            terms.append(lower)
+        elif lower in _NEGATION_WORDS:
+            terms.append(_NEGATION_WORDS[lower])
+        elif lower not in _NON_PARTIES and lower not in _ROLE_MARKERS and (word[0].isupper() or following in _ROLE_MARKERS):
+            terms.append(lower)
+    return tuple(terms)
+
+def replay_stream(response: str):
+    """Yields a cached response line by line so the UI renders it like a live stream."""
+    for line in response.splitlines(keepends=True):
+        yield line
+
+class ResponseCache:
+    """
+    LRU + TTL cache of finished responses, keyed by normalized story text, with a
+    semantic (embedding) lookup for near-duplicates. Thread-safe.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 1000, ttl_seconds: float = 7 * 24 * 3600,
+                 similarity_threshold: float = 0.97, save_interval_seconds: float = 30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.save_interval_seconds = save_interval_seconds
+        # normalized text -> {"numbers", "terms", "embedding", "response", "created"}; oldest use first
+        self._entries = OrderedDict()
+        # Stacked normalized embeddings and the keys of their rows, rebuilt lazily after entries
+        # are added or removed. LRU reordering does not touch them: rows are looked up by key.
+        self._matrix = None
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+        # Persistence state: a save is pending while _dirty; _save_lock serializes file writes
+        self._dirty = False
+        self._save_timer = None
+        self._save_lock = threading.Lock()
+        self._atexit_registered = False
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    # --- Lookups ---
+    def get(self, story: str, embedding=None) -> str:
+        """Returns the cached response for `story`, or None on a miss."""
+        key = normalize_text(story)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry["response"]
+
+            if embedding is not None and self._entries:
+                match = self._find_similar(normalize(embedding)[0], extract_numbers(story), extract_key_terms(story))
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self.semantic_hits += 1
+                    return self._entries[match]["response"]
+
+            self.misses += 1
+            return None
+
+    def _find_similar(self, query: np.ndarray, numbers: tuple, terms: tuple):
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries)
+            self._matrix = np.vstack([self._entries[k]["embedding"] for k in self._matrix_keys])
+        keys = self._matrix_keys
+        scores = self._matrix @ query
+        # Best candidates first; only a candidate with identical numbers and key terms may be served.
+        # Entries loaded from an older cache file have no terms and can only hit exactly.
+        for i in np.argsort(scores)[::-1]:
+            if scores[i] < self.similarity_threshold:
+                break
+            entry = self._entries[keys[i]]
+            if entry["numbers"] == numbers and entry.get("terms") == terms:
+                return keys[i]
+        return None
+
+    # --- Updates ---
+    def put(self, story: str, embedding, response: str):
+        """Caches `response` for `story`, evicting the least recently used entry if full."""
+        if not response:
+            return
+        key = normalize_text(story)
+        with self._lock:
+            self._entries[key] = {"numbers": extract_numbers(story), "terms": extract_key_terms(story),
+                                  "embedding": normalize(embedding)[0], "response": response, "created": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+            self._schedule_save_locked()
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [k for k, entry in self._entries.items() if entry["created"] < cutoff]
+        for k in expired:
+            del self._entries[k]
+        if expired:
+            self._matrix = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {"entries": len(self._entries), "exact_hits": self.exact_hits,
+                    "semantic_hits": self.semantic_hits, "misses": self.misses,
+                    "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0}
+
+    # --- Persistence ---
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                entries = pickle.load(f)
+        except Exception as e:
+            print(f"Response cache '{self.path}' load nahi ho paya, khali cache se shuru kar rahe hain: {e}")
+            return
+        with self._lock:
+            self._entries = OrderedDict(entries)
+            self._expire()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def _schedule_save_locked(self):
+        if not self.path:
+            return
+        self._dirty = True
+        if not self._atexit_registered:
+            atexit.register(self.save)
+            self._atexit_registered = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_interval_seconds, self.save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def save(self):
+        """
+        Writes the cache to `path` if it changed since the last save. Runs on the save timer and
+        at exit; the pickling happens on a snapshot, outside the lock lookups take.
+        """
+        with self._save_lock:
+            with self._lock:
+                self._save_timer = None
+                if not self.path or not self._dirty:
+                    return
+                self._dirty = False
+                entries = list(self._entries.items())
+            # The cache is bounded by max_entries, so rewriting it is cheap; temp file + rename
+            # keeps a crash from leaving a half-written cache behind.
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(entries, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Response cache '{self.path}' save nahi ho paya: {e}")
+                with self._lock:
+                    self._dirty = True
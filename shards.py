@@ -0,0 +1,168 @@
+# shards.py - Per-User Shards of Learned Prompts
+#
+# The shared vector store (vectordb.hissab_db) holds the seed examples. Prompts learned from a
+# signed-in user go to that user's own shards instead, one per (user, category):
+#
+#   <HISSAB_SHARD_DIR>/<tenant>/<hh>/<user hash>/<category>.{f32,meta.jsonl,manifest.json}
+#
+# Each shard is an ordinary append-only VectorStore (vector_store.py) plus a small ExactIndex.
+# Shards are loaded on first use and kept in an LRU of resident shards. When the resident
+# shards exceed HISSAB_SHARD_MEMORY_MB (index matrices plus record text), the least recently
+# used ones are dropped from memory; their files stay on disk and are reloaded on demand. So
+# process memory is bounded by the cap, not by the number of users.
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from vector_index import ExactIndex
+from vector_store import VectorStore
+
+SHARD_DIR = os.getenv("HISSAB_SHARD_DIR", "hissab_shards")
+SHARD_TENANT = os.getenv("HISSAB_TENANT", "default")
+SHARD_MEMORY_MB = float(os.getenv("HISSAB_SHARD_MEMORY_MB", "256"))
+# Per-user shards are small, so their index matrices start small too
+_SHARD_INITIAL_CAPACITY = 8
+# Number of per-key locks; loads and appends of one (user, category) are serialized by its lock
+_KEY_LOCK_STRIPES = 64
+
+class Shard:
+    """One user's prompts in one category: the on-disk store and its in-memory index."""
+
+    def __init__(self, category: str, store: VectorStore):
+        self.category = category
+        self.store = store
+        self.index = ExactIndex(store.dim, initial_capacity=_SHARD_INITIAL_CAPACITY)
+        # Like the shared example index, only answered rows are searchable
+        rows = store.rows_for_category(category, answered_only=True)
+        if len(rows):
+            self.index.add(category, rows, store.embeddings[rows])
+        # The index holds normalized copies; do not keep the file mapped as well
+        store.release_mapping()
+        self._text_bytes = sum(len(r["user_text"]) + len(r["model_response"]) for r in map(store.get_record, range(len(store))))
+
+    @property
+    def nbytes(self) -> int:
+        return self.index.nbytes + self._text_bytes
+
+    def append(self, records: list, embeddings):
+        row_ids = self.store.append(records, embeddings)
+        self.store.release_mapping()
+        answered = [i for i, record in enumerate(records) if record.get("model_response")]
+        if answered:
+            self.index.add(self.category, [row_ids[i] for i in answered], np.asarray(embeddings)[answered])
+        self._text_bytes += sum(len(r["user_text"]) + len(r.get("model_response", "")) for r in records)
+
+    def search(self, query, top_k: int) -> list:
+        rows, scores = self.index.search(self.category, query, top_k)
+        return [(self.store.get_record(row), float(score)) for row, score in zip(rows, scores)]
+
+class ShardManager:
+    """
+    Loads per-user shards on demand and keeps the most recently used ones resident, evicting
+    LRU shards beyond `memory_cap_mb`. Two kinds of locks:
+      - a striped per-key lock, held for a whole search/append of one (user, category), so a
+        shard is loaded or created by one thread at a time and its index is not read mid-update;
+      - the global lock, held only for LRU bookkeeping, never across disk I/O.
+    """
+
+    def __init__(self, root: str = SHARD_DIR, tenant: str = SHARD_TENANT, memory_cap_mb: float = SHARD_MEMORY_MB,
+                 dtype: str = "float32", fsync: bool = True):
+        self.root = root
+        self.tenant = tenant
+        self.memory_cap_bytes = int(memory_cap_mb * 1024 * 1024)
+        self.dtype = dtype
+        self.fsync = fsync
+        self._resident = OrderedDict()
+        self._resident_bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(_KEY_LOCK_STRIPES)]
+        self.hits = 0
+        self.loads = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _base_path(self, user_id: str, category: str) -> str:
+        user_hash = hashlib.sha256(str(user_id).encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.root, self.tenant, user_hash[:2], user_hash, category)
+
+    def _key_lock(self, key: tuple) -> threading.Lock:
+        return self._key_locks[hash(key) % len(self._key_locks)]
+
+    def _get(self, user_id: str, category: str, dim: int = None):
+        """
+        Resident shard for (user, category), loading it from disk; with `dim`, creates it if
+        missing. The caller holds the key's lock; the global lock is not held while loading.
+        """
+        key = (user_id, category)
+        with self._lock:
+            shard = self._resident.get(key)
+            if shard is not None:
+                self._resident.move_to_end(key)
+                self.hits += 1
+                return shard
+
+        store = VectorStore(self._base_path(user_id, category), dtype=self.dtype, fsync=self.fsync)
+        from_disk = store.exists()
+        if from_disk:
+            store.load()
+        elif dim is not None:
+            os.makedirs(os.path.dirname(store.base_path), exist_ok=True)
+            store.create(dim)
+        else:
+            with self._lock:
+                self.misses += 1
+            return None
+        loaded = Shard(category, store)
+
+        with self._lock:
+            # Check the LRU again before inserting, in case the shard became resident meanwhile
+            shard = self._resident.get(key)
+            if shard is not None:
+                self._resident.move_to_end(key)
+                self.hits += 1
+                return shard
+            self.loads += from_disk
+            self._resident[key] = loaded
+            self._resident_bytes += loaded.nbytes
+            self._evict_locked(keep=key)
+        return loaded
+
+    def _evict_locked(self, keep=None):
+        while self._resident_bytes > self.memory_cap_bytes and len(self._resident) > 1:
+            key, shard = next(iter(self._resident.items()))
+            if key == keep:
+                self._resident.move_to_end(key)
+                continue
+            del self._resident[key]
+            self._resident_bytes -= shard.nbytes
+            self.evictions += 1
+
+    def search(self, user_id: str, category: str, query, top_k: int = 3) -> list:
+        """[(record, similarity), ...] from the user's shard, best first; empty if they have none."""
+        with self._key_lock((user_id, category)):
+            shard = self._get(user_id, category)
+            return shard.search(query, top_k) if shard is not None else []
+
+    def append(self, user_id: str, category: str, records: list, embeddings):
+        """Commits records to the user's shard (one atomic append), creating the shard if needed."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        key = (user_id, category)
+        with self._key_lock(key):
+            shard = self._get(user_id, category, dim=embeddings.shape[1])
+            before = shard.nbytes
+            shard.append(records, embeddings)
+            with self._lock:
+                # An evicted shard no longer counts towards the resident bytes
+                if self._resident.get(key) is shard:
+                    self._resident_bytes += shard.nbytes - before
+                    self._evict_locked(keep=key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"resident_shards": len(self._resident), "resident_mb": round(self._resident_bytes / 1024 / 1024, 2),
+                    "memory_cap_mb": round(self.memory_cap_bytes / 1024 / 1024, 2), "hits": self.hits,
+                    "loads": self.loads, "misses": self.misses, "evictions": self.evictions}
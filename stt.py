@@ -0,0 +1,103 @@
+# stt.py - Pluggable Speech-to-Text Backends
+#
+# Backends (HISSAB_STT_BACKEND):
+#   "google" - Google Web Speech via speech_recognition (the original behaviour, needs network).
+#   "vosk"   - Offline Vosk/Kaldi model on the CPU (`pip install vosk` plus a model such as
+#              vosk-model-small-hi-0.22 at HISSAB_VOSK_MODEL_PATH). PCM chunks are fed to the
+#              recognizer while ffmpeg is still decoding, so transcription overlaps decoding
+#              instead of starting after it.
+#
+# Every backend takes the raw recorded bytes and returns the transcript, raising NoSpeechError
+# when nothing intelligible was said and ServiceError when the engine itself failed.
+
+import json
+import os
+import threading
+
+import tracing
+from audio import TARGET_SAMPLE_RATE, iter_pcm_chunks, to_audio_data
+
+STT_BACKEND = os.getenv("HISSAB_STT_BACKEND", "google")
+STT_LANGUAGE = os.getenv("HISSAB_STT_LANGUAGE", "hi-IN")
+VOSK_MODEL_PATH = os.getenv("HISSAB_VOSK_MODEL_PATH", "models/vosk-model-small-hi-0.22")
+# Size of the PCM chunks handed to streaming engines
+STT_CHUNK_MS = int(os.getenv("HISSAB_STT_CHUNK_MS", "250"))
+
+class NoSpeechError(Exception):
+    """The audio contained no recognizable speech."""
+
+class ServiceError(Exception):
+    """The speech-to-text engine could not be reached or failed."""
+
+class GoogleSTT:
+    """Google Web Speech API through speech_recognition (decodes fully, then one request)."""
+    name = "google"
+
+    def __init__(self, language: str = STT_LANGUAGE):
+        import speech_recognition as sr
+        self._sr = sr
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio_bytes: bytes) -> str:
+        audio_data = to_audio_data(audio_bytes)
+        try:
+            return self.recognizer.recognize_google(audio_data, language=self.language)
+        except self._sr.UnknownValueError as e:
+            raise NoSpeechError() from e
+        except self._sr.RequestError as e:
+            raise ServiceError(f"Google Speech Recognition service se connect nahin ho paya; {e}") from e
+
+class VoskSTT:
+    """Offline Vosk recognizer, fed chunk by chunk as the audio is decoded."""
+    name = "vosk"
+
+    def __init__(self, model_path: str = VOSK_MODEL_PATH, chunk_ms: int = STT_CHUNK_MS):
+        try:
+            import vosk
+        except ImportError as e:
+            raise ServiceError("Vosk backend ke liye 'pip install vosk' chahiye.") from e
+        if not os.path.isdir(model_path):
+            raise ServiceError(f"Vosk model '{model_path}' nahi mila (HISSAB_VOSK_MODEL_PATH set karein).")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        # The model is read-only and shared; each transcription gets its own recognizer
+        self.model = vosk.Model(model_path)
+        self.chunk_ms = chunk_ms
+
+    def transcribe(self, audio_bytes: bytes) -> str:
+        recognizer = self._vosk.KaldiRecognizer(self.model, TARGET_SAMPLE_RATE)
+        segments = []
+        try:
+            for chunk in iter_pcm_chunks(audio_bytes, chunk_ms=self.chunk_ms):
+                # AcceptWaveform returns True at the end of an utterance (a pause)
+                if recognizer.AcceptWaveform(chunk):
+                    segments.append(json.loads(recognizer.Result()).get("text", ""))
+        except ValueError as e:
+            raise ServiceError(str(e)) from e
+        segments.append(json.loads(recognizer.FinalResult()).get("text", ""))
+        text = " ".join(s for s in segments if s).strip()
+        if not text:
+            raise NoSpeechError()
+        return text
+
+STT_ENGINES = {"google": GoogleSTT, "vosk": VoskSTT}
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_stt_engine(backend: str = None):
+    """Returns the process-wide engine for `backend` (default: HISSAB_STT_BACKEND)."""
+    backend = backend or STT_BACKEND
+    if backend not in STT_ENGINES:
+        raise ValueError(f"Unknown STT backend: {backend} (choose from {', '.join(STT_ENGINES)})")
+    with _engines_lock:
+        if backend not in _engines:
+            _engines[backend] = STT_ENGINES[backend]()
+        return _engines[backend]
+
+def transcribe(audio_bytes: bytes, backend: str = None) -> str:
+    """Transcribes recorded audio bytes with the configured backend (timed as the "stt" stage)."""
+    engine = get_stt_engine(backend)
+    with tracing.span("stt"):
+        return engine.transcribe(audio_bytes)
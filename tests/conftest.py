@@ -0,0 +1,40 @@
+# The app is a set of top-level modules, so make them importable from the tests
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class HashingEncoder:
+    """Deterministic bag-of-character-trigrams encoder standing in for the embedding model."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, **kwargs):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = f"  {text.lower()} "
+            for i in range(len(text) - 2):
+                digest = hashlib.blake2b(text[i:i + 3].encode("utf-8"), digest_size=4).digest()
+                vectors[row, int.from_bytes(digest, "little") % self.dim] += 1.0
+        return vectors
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """An empty vector DB in tmp_path with an offline encoder and local classification only."""
+    pytest.importorskip("dotenv")
+    import vectordb
+
+    base = str(tmp_path / "db")
+    monkeypatch.setattr(vectordb, "STORE_BASE_PATH", base)
+    monkeypatch.setattr(vectordb, "INDEX_FILE_PATH", base + ".ivf.npz")
+    monkeypatch.setattr(vectordb, "DB_FILE_PATH", str(tmp_path / "legacy.pkl"))
+    for name in ("hissab_db", "_index", "_category_sums", "_category_centroids"):
+        monkeypatch.setattr(vectordb, name, None)
+    monkeypatch.setattr(vectordb, "_embedding_model", HashingEncoder())
+    monkeypatch.setattr(vectordb, "is_confident", lambda similarity, margin: True)
+    return vectordb
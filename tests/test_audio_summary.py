@@ -0,0 +1,56 @@
+# Tests for main2.AudioSummaryJob: the spoken summary follows the stream's status, not its text
+
+import sys
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+import main2
+import tts
+
+@pytest.fixture(autouse=True)
+def fake_gtts(tmp_path, monkeypatch):
+    class gTTS:
+        def __init__(self, text, lang, tld, slow):
+            self.text = text
+
+        def save(self, path):
+            with open(path, "wb") as f:
+                f.write(self.text.encode("utf-8"))
+
+    monkeypatch.setitem(sys.modules, "gtts", types.SimpleNamespace(gTTS=gTTS))
+    monkeypatch.setattr(tts, "_cache", tts.AudioCache(str(tmp_path / "audio")))
+    # Own worker pool, drained before the patches above are undone: a job dropped by the test
+    # may still be synthesizing
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(tts, "_executor", executor)
+    yield
+    executor.shutdown(wait=True)
+
+def _stream(lines, status):
+    for line in lines:
+        yield line
+    return status
+
+def _run(lines, status):
+    job = main2.AudioSummaryJob(api_key=None)
+    text = "".join(job.watch(_stream(lines, status)))
+    return job, text, job.result(timeout=10)
+
+def test_answered_stream_gets_its_conclusion_spoken():
+    job, text, audio_file = _run(["**Trip ka Hisaab:**\n", "- **Isliye, Suman ko aapko ₹3,000 dene hain.**\n"], "local")
+    assert job.status == "local"
+    with open(audio_file, encoding="utf-8") as f:
+        assert f.read() == "Hisaab ke anusaar, Suman ko aapko 3,000 rupaye dene hain."
+
+def test_failed_stream_gets_no_audio_even_after_a_conclusion():
+    job, text, audio_file = _run(["- **Isliye, Suman ko aapko ₹3,000 dene hain.**\n", "⚠️ Hisaab lagate samay error aaya: boom"], "error")
+    assert job.status == "error"
+    assert audio_file is None
+
+@pytest.mark.parametrize("status", ["busy", "empty"])
+def test_unanswered_stream_gets_no_audio(status):
+    assert _run(["Kul Kharch: ₹500\n"], status)[2] is None
@@ -0,0 +1,53 @@
+# Tests for batch.py: every story gets its own answer, and one failure does not sink the batch
+
+import json
+import re
+import time
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+import batch
+import vectordb
+from llm_client import FakeBackend, LLMClient
+
+STORIES = [f"Story {i}: maine dukaan par {100 * (i + 1)} rupaye diye" for i in range(8)]
+FAILING = {2, 5}
+
+def _responder(prompt):
+    story = prompt.split("--- FINAL TASK ---")[1]
+    number = int(re.search(r"Story (\d+)", story).group(1))
+    if number in FAILING:
+        raise ValueError(f"bad story {number}")
+    # Later stories answer first, so completion order is the reverse of input order
+    time.sleep((len(STORIES) - number) * 0.01)
+    return f"**Isliye, story {number} ka hisaab ho gaya.**"
+
+def test_batch_answers_each_story_and_isolates_failures(tmp_path, fresh_db):
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    input_path.write_text("".join(json.dumps({"id": i, "story": s}) + "\n" for i, s in enumerate(STORIES)) + '{"id": "empty"}\n',
+                          encoding="utf-8")
+    client = LLMClient(FakeBackend(responder=_responder), max_retries=0)
+
+    summary = batch.process_batch(str(input_path), str(output_path), concurrency=4, client=client)
+
+    results = {r["id"]: r for r in map(json.loads, output_path.read_text(encoding="utf-8").splitlines())}
+    assert set(results) == set(range(len(STORIES))) | {"empty"}
+    for i, story in enumerate(STORIES):
+        assert results[i]["story"] == story
+        if i in FAILING:
+            assert results[i]["response"] is None
+            assert results[i]["error"] == f"ValueError: bad story {i}"
+        else:
+            assert results[i]["error"] is None
+            assert results[i]["response"] == f"**Isliye, story {i} ka hisaab ho gaya.**"
+    assert results["empty"]["error"] == "empty story"
+    assert summary["processed"] == len(STORIES) + 1
+    assert summary["failed"] == len(FAILING) + 1
+
+    # Only answered stories are learned, in input order, after the seed examples
+    learned = [i for i in range(len(STORIES)) if i not in FAILING]
+    assert summary["learned"] == len(learned)
+    db = vectordb.hissab_db
+    assert [db.get_record(row)["user_text"] for row in range(len(db) - len(learned), len(db))] == [STORIES[i] for i in learned]
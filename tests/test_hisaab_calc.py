@@ -0,0 +1,75 @@
+# Table-driven tests for hisaab_calc.py: each solver's answers, and stories it must decline
+
+import pytest
+
+import hisaab_calc
+from hisaab_calc import format_inr, settle_debts, solve
+
+# (category, story, lines that must appear in the answer)
+SOLVED = [
+    ("personal_expense_tracking", "Aaj 30 rupaye bus ke lage, 250 ka khana khaya, aur 500 ki ek shirt kharidi.",
+     ["- Bus: ₹30", "- Khana: ₹250", "- Shirt: ₹500", "**Kul Kharch: ₹780**"]),
+    ("personal_expense_tracking", "Sabzi 200 ki, doodh 60 ka.", ["**Kul Kharch: ₹260**"]),
+    ("discount_and_offers", "Ek jacket 4000 ki hai aur us par 20% ka discount hai. Mujhe kitne paise dene honge?",
+     ["- **Jacket ka Daam:** ₹4,000", "- **Discount (20%):** ₹800 (4000 ka 20%)", "- **Isliye, aapko ₹3,200 dene honge.**"]),
+    ("discount_and_offers", "Shirt sale mein 1000 ki hai, 10% off hai.",
+     ["- **Shirt ka Daam:** ₹1,000", "- **Isliye, aapko ₹900 dene honge.**"]),
+    ("discount_and_offers", "Sale mein 1500 ki shirt par 10% discount hai.", ["- **Shirt ka Daam:** ₹1,500"]),
+    ("salary_calculation", "Main din ke 800 rupaye kamata hoon. Is mahine maine 25 din kaam kiya. Meri is mahine ki salary kitni hui?",
+     ["- **Ek Din ki Kamai:** ₹800", "- **Kul Kaam ke Din:** 25",
+      "- **Isliye, aapki is mahine ki salary ₹20,000 hui (800 x 25).**"]),
+    ("salary_calculation", "Ek ghante ke 200 milte hain, maine 6 ghante kaam kiya.",
+     ["- **Isliye, aapki kul kamai ₹1,200 hui (200 x 6).**"]),
+    ("loan_and_emi", "Mera 2 lakh ka personal loan hai aur har mahine 5000 ki EMI jaati hai. 1 saal mein main kitna chuka dunga?",
+     ["- **Ek Saal (12 Mahine) mein Kul Bhugtaan:** ₹60,000 (5000 x 12)"]),
+    ("loan_and_emi", "Maine 10000 ka loan liya 2 saal ke liye 0% par",
+     ["- **Har Mahine ki EMI:** ₹417", "- **Kul Bhugtaan:** ₹10,000 (Byaaj ₹0)"]),
+    ("group_settlement", "Hum 3 dost, main, Rohit aur Suman, Goa gaye. Maine hotel ke 6000 diye, Rohit ne khaane ke 3000 kharch kiye. Suman ne kuch nahi diya.",
+     ["- **Prati Vyakti Hissa:** ₹3,000", "- **Isliye, Suman ko aapko ₹3,000 dene hain.**"]),
+]
+
+# (category, story) pairs the local engine must hand to the LLM
+DECLINED = [
+    ("personal_expense_tracking", "Mere paas 1000 the, 200 ka khana khaya aur 300 ki shirt li. Kitne bache?"),
+    ("personal_expense_tracking", "200 ka khana khaya aur 300 ki shirt li, balance kitna hai?"),
+    ("personal_expense_tracking", "Khana 200 ka."),
+    ("personal_expense_tracking", "Meri salary 30000 hai, 5000 rent aur 2000 bill."),
+    ("discount_and_offers", "Shirt 1000 ki hai."),
+    ("discount_and_offers", "Shirt 1000 ki hai, 10% discount aur 5% extra off."),
+    ("salary_calculation", "Meri salary 30000 mahine ki hai, 10 din chutti li, kitni kategi?"),
+    ("salary_calculation", "Roz 8 ghante kaam karta hoon, 500 milte hain."),
+    ("salary_calculation", "Mujhe 500 milte hain, maine 8 ghante kaam kiya."),
+    ("salary_calculation", "Din ke 800 milte hain, maine 6 ghante kaam kiya."),
+    ("salary_calculation", "Din ke 800 milte hain, 25 din kaam kiya aur 2000 bonus mila."),
+    ("loan_and_emi", "Loan 5000 ka hai."),
+    ("group_settlement", "Hum 4 dost, main, Rohit aur Suman. Maine 900 diye."),
+    ("group_settlement", "Hum 2 dost the. Maine 1000 ka khana khilaya, Rohit ne mujhe 200 diye."),
+    ("group_settlement", "Hum 3 dost, main, Rohit aur Suman, Goa gaye. Maine hotel ke 6000 diye, Rohit ne mujhe 1000 diye."),
+    ("group_settlement", "Maine 900 diye, Rohit ne Suman ko 300 diye"),
+    ("group_settlement", "Main aur Rohit. Rohit ne mujhe 500 diye."),
+    ("group_settlement", "Rohit ne 500 diye aur Amit ne 300 diye."),
+    ("price_comparison", "Ek phone 25000 ka aur doosra 23500 ka."),
+]
+
+@pytest.mark.parametrize("category, story, expected", SOLVED)
+def test_solves(category, story, expected):
+    answer = solve(story, category)
+    assert answer is not None
+    for line in expected:
+        assert line in answer.splitlines()
+
+@pytest.mark.parametrize("category, story", DECLINED)
+def test_declines(category, story):
+    assert solve(story, category) is None
+
+def test_every_solver_is_covered():
+    categories = {category for category, _, _ in SOLVED} & {category for category, _ in DECLINED}
+    assert set(hisaab_calc.SOLVERS) <= categories
+
+@pytest.mark.parametrize("amount, text", [(830, "₹830"), (200000, "₹2,00,000"), (1500.5, "₹1,500.50"), (-3000, "-₹3,000")])
+def test_format_inr(amount, text):
+    assert format_inr(amount) == text
+
+def test_settle_debts_uses_few_transfers():
+    transfers = settle_debts({"A": 3000, "B": 0, "C": -1000, "D": -2000})
+    assert sorted(transfers) == [("C", "A", 1000), ("D", "A", 2000)]
@@ -0,0 +1,51 @@
+# Tests for llm_client.py: retries, and that concurrency slots are always given back
+
+import asyncio
+
+import pytest
+
+from llm_client import FakeBackend, LLMBusyError, LLMClient
+
+def test_retries_rate_limits_then_succeeds():
+    backend = FakeBackend(responder=lambda prompt: "theek hai", failures=2)
+    client = LLMClient(backend, max_retries=3, base_delay=0.001)
+    assert client.generate("x") == "theek hai"
+    assert backend.calls == 3
+
+def test_gives_up_after_max_retries():
+    client = LLMClient(FakeBackend(failures=5), max_retries=1, base_delay=0.001)
+    with pytest.raises(Exception, match="429"):
+        client.generate("x")
+    # Both attempts gave their slot back
+    assert client._semaphore.acquire(blocking=False)
+
+def test_stream_yields_whole_answer():
+    client = LLMClient(FakeBackend(responder=lambda prompt: "ek do teen"))
+    assert "".join(client.stream("x")) == "ek do teen"
+
+def test_closed_stream_releases_its_slot():
+    client = LLMClient(FakeBackend(responder=lambda prompt: "ek do teen"), max_concurrency=1, queue_timeout=0.1)
+    stream = client.stream("x")
+    next(stream)
+    stream.close()
+    assert "".join(client.stream("x")) == "ek do teen"
+
+def test_waiting_for_a_slot_times_out():
+    client = LLMClient(FakeBackend(responder=lambda prompt: "ek do teen"), max_concurrency=1, queue_timeout=0.05)
+    stream = client.stream("x")
+    next(stream)
+    with pytest.raises(LLMBusyError):
+        client.generate("y")
+    with pytest.raises(LLMBusyError):
+        list(client.stream("z"))
+    stream.close()
+    assert client.generate("y") == "ek do teen"
+
+def test_async_api_shares_the_limits():
+    client = LLMClient(FakeBackend(responder=lambda prompt: "ek do teen", failures=1), base_delay=0.001)
+
+    async def run():
+        chunks = [text async for text in client.astream("x")]
+        return "".join(chunks), await client.agenerate("y")
+
+    assert asyncio.run(run()) == ("ek do teen", "ek do teen")
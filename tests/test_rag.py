@@ -0,0 +1,36 @@
+# Tests for rag.py: example selection and retrieval after the DB has learned many prompts
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+import rag
+from vectordb import QueryContext
+
+STORY = "Hum 3 dost, main, Rohit aur Suman, Goa gaye. Maine hotel ke 6000 diye, Rohit ne khaane ke 3000 kharch kiye."
+
+def _example(text, similarity, response="**Isliye, ...**"):
+    return {"user_text": text, "model_response": response, "similarity": similarity}
+
+def test_select_examples_skips_unanswered_and_duplicates():
+    candidates = [_example("a b c d", 0.9, response=""), _example("a b c d e", 0.8), _example("a b c d e f", 0.7),
+                  _example("x y z", 0.6)]
+    assert [e["user_text"] for e in rag.select_examples(candidates, token_budget=1000)] == ["a b c d e", "x y z"]
+
+def test_select_examples_respects_token_budget():
+    candidates = [_example("short story", 0.9), _example("long story " * 200, 0.89)]
+    assert [e["user_text"] for e in rag.select_examples(candidates, token_budget=100)] == ["short story"]
+
+def test_learned_prompts_do_not_crowd_out_examples(fresh_db):
+    fresh_db.ensure_vector_db()
+    # Many near-identical learned stories: stored without a response, closer to the query than any seed
+    learned = [f"{STORY} Trip {i}." for i in range(rag.PROMPT_CANDIDATES + 5)]
+    fresh_db.add_user_prompts_to_db(learned, [QueryContext(text, category="group_settlement") for text in learned])
+
+    candidates = fresh_db.find_similar_prompts(STORY, "group_settlement", top_k=rag.PROMPT_CANDIDATES)
+    assert candidates and all(c["model_response"] for c in candidates)
+
+    context = QueryContext(STORY, category="group_settlement")
+    prompt = rag.get_enhanced_prompt(STORY, context=context)
+    assert context.prompt_examples >= 1
+    assert "--- EXAMPLE 1 ---" in prompt
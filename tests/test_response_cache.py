@@ -0,0 +1,64 @@
+# Tests for response_cache.py: exact/semantic lookups, LRU order and persistence
+
+import numpy as np
+
+from response_cache import ResponseCache, extract_key_terms
+
+def _vec(*values):
+    vector = np.zeros(8, dtype=np.float32)
+    vector[:len(values)] = values
+    return vector
+
+def test_exact_hit_does_not_desync_semantic_lookup():
+    cache = ResponseCache()
+    cache.put("story A 100", _vec(1, 0), "RESP A")
+    cache.put("story B 100", _vec(0, 1), "RESP B")
+    # Builds the similarity matrix in A, B order
+    assert cache.get("story C 100", _vec(0.7, 0.7)) is None
+    # Exact hit on A moves it to the end of the LRU order
+    assert cache.get("story A 100", _vec(1, 0)) == "RESP A"
+    # Close to B only; must never be answered with A's response
+    assert cache.get("story  B 100!", _vec(0.01, 1)) == "RESP B"
+    assert cache.get("story B 100 ok", _vec(0.01, 1)) == "RESP B"
+
+def test_semantic_hit_requires_same_numbers():
+    cache = ResponseCache()
+    cache.put("3 dost, 6000 kharch", _vec(1, 0), "RESP 3")
+    assert cache.get("4 dost, 6000 kharch", _vec(1, 0)) is None
+    assert cache.get("3 dost 6000 ka kharch", _vec(1, 0)) == "RESP 3"
+
+def test_semantic_hit_requires_same_parties_and_direction():
+    cache = ResponseCache()
+    cache.put("Rohit ne Suman ko 500 diye", _vec(1, 0), "Suman owes Rohit")
+    assert cache.get("Suman ne Rohit ko 500 diye", _vec(1, 0)) is None
+    assert cache.get("Rohit ne Suman se 500 liye", _vec(1, 0)) is None
+    assert cache.get("Rohit ne Suman ko 500 rupaye diye", _vec(1, 0)) == "Suman owes Rohit"
+
+def test_semantic_hit_requires_same_negation():
+    cache = ResponseCache()
+    cache.put("Rohit ne mujhe 300 diye", _vec(1, 0), "Rohit paid you")
+    assert cache.get("Rohit ne mujhe 300 nahi diye", _vec(1, 0)) is None
+    assert extract_key_terms("Rohit ne mujhe 300 nahin diye") == extract_key_terms("Rohit ne mujhe 300 nahi diye")
+
+def test_key_terms_cover_lowercase_names():
+    assert extract_key_terms("rohit ne suman ko 500 diye") == ("rohit", "suman", "diye")
+    assert extract_key_terms("Maine Rohit ko 200 diye") == ("rohit", "diye")
+
+def test_lru_eviction_keeps_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a 1", _vec(1, 0), "A")
+    cache.put("b 2", _vec(0, 1), "B")
+    cache.get("a 1")
+    cache.put("c 3", _vec(0, 0, 1), "C")
+    assert cache.get("b 2") is None
+    assert cache.get("a 1") == "A"
+
+def test_put_does_not_write_until_save(tmp_path):
+    path = str(tmp_path / "cache.pkl")
+    cache = ResponseCache(path=path, save_interval_seconds=3600)
+    cache.put("a 1", _vec(1, 0), "A")
+    assert not (tmp_path / "cache.pkl").exists()
+    cache.save()
+    reloaded = ResponseCache(path=path)
+    reloaded.load()
+    assert reloaded.get("a 1") == "A"
@@ -0,0 +1,46 @@
+# Tests for shards.py: per-user isolation, LRU eviction and concurrent appends
+
+import threading
+
+import numpy as np
+
+from shards import ShardManager
+from vector_index import normalize
+
+def _records(user_id, count):
+    return [{"category": "group_settlement", "user_text": f"{user_id} story {i}", "model_response": "ok"} for i in range(count)]
+
+def test_users_only_see_their_own_prompts(tmp_path):
+    manager = ShardManager(root=str(tmp_path), fsync=False)
+    rng = np.random.default_rng(0)
+    manager.append("alice", "group_settlement", _records("alice", 2), normalize(rng.standard_normal((2, 16))))
+    results = manager.search("alice", "group_settlement", rng.standard_normal(16), top_k=5)
+    assert {r["user_text"] for r, _ in results} == {"alice story 0", "alice story 1"}
+    assert manager.search("bob", "group_settlement", rng.standard_normal(16)) == []
+
+def test_evicted_shards_reload_from_disk(tmp_path):
+    manager = ShardManager(root=str(tmp_path), memory_cap_mb=0, fsync=False)
+    rng = np.random.default_rng(1)
+    for user in ("a", "b", "c"):
+        manager.append(user, "group_settlement", _records(user, 3), normalize(rng.standard_normal((3, 16))))
+    assert manager.stats()["resident_shards"] == 1
+    results = manager.search("a", "group_settlement", rng.standard_normal(16), top_k=3)
+    assert len(results) == 3
+    assert manager.stats()["loads"] == 1
+
+def test_concurrent_appends_to_one_shard_are_all_kept(tmp_path):
+    manager = ShardManager(root=str(tmp_path), fsync=False)
+    rng = np.random.default_rng(2)
+    vectors = normalize(rng.standard_normal((40, 16)))
+
+    def worker(offset):
+        for i in range(offset, 40, 4):
+            manager.append("alice", "group_settlement", _records(f"alice-{i}", 1), vectors[i:i + 1])
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    reloaded = ShardManager(root=str(tmp_path))
+    assert len(reloaded.search("alice", "group_settlement", vectors[0], top_k=100)) == 40
@@ -0,0 +1,51 @@
+# Tests for tts.py: voice selection, the MP3 cache and the legacy file cleanup
+
+import sys
+import types
+
+import pytest
+
+import tts
+
+@pytest.fixture
+def fake_gtts(tmp_path, monkeypatch):
+    """Offline gTTS that records how it was called; the cache lives in a temp directory."""
+    calls = []
+
+    class gTTS:
+        def __init__(self, text, lang, tld, slow):
+            calls.append((text, lang, tld))
+
+        def save(self, path):
+            with open(path, "wb") as f:
+                f.write(b"ID3")
+
+    monkeypatch.setitem(sys.modules, "gtts", types.SimpleNamespace(gTTS=gTTS))
+    monkeypatch.setattr(tts, "_cache", tts.AudioCache(str(tmp_path / "audio"), max_files=2))
+    return calls
+
+@pytest.mark.parametrize("text, voice", [
+    ("Hisaab ke anusaar, Suman ko aapko ₹3,000 dene hain.", tts.ROMAN_VOICE),
+    ("हिसाब के अनुसार, सुमन को आपको ₹3,000 देने हैं।", tts.DEVANAGARI_VOICE),
+])
+def test_voice_follows_script(text, voice):
+    assert tts.voice_for(text) == voice
+
+def test_speakable_spells_out_rupees():
+    assert tts.speakable("Aapko ₹3,000 aur ₹ 20.50 dene hain.") == "Aapko 3,000 rupaye aur 20.50 rupaye dene hain."
+
+def test_romanized_summary_uses_indian_english_voice_and_cache(fake_gtts):
+    first = tts.synthesize("Hisaab taiyaar hai, ₹500 bache.")
+    assert tts.synthesize("Hisaab taiyaar hai, ₹500 bache.") == first
+    assert fake_gtts == [("Hisaab taiyaar hai, 500 rupaye bache.", "en", "co.in")]
+
+def test_cache_evicts_least_recently_used(fake_gtts):
+    paths = [tts.synthesize(f"Hisaab {i}") for i in range(3)]
+    assert tts.get_audio_cache().get("Hisaab 0", "en-co.in", False) is None
+    assert tts.synthesize("Hisaab 2") == paths[2]
+
+def test_legacy_response_files_are_removed(tmp_path):
+    (tmp_path / "response_1234.mp3").write_bytes(b"ID3")
+    (tmp_path / "keep.mp3").write_bytes(b"ID3")
+    assert tts.remove_legacy_audio_files(str(tmp_path)) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["keep.mp3"]
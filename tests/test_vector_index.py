@@ -0,0 +1,29 @@
+# Tests for vector_index.py: the IVF quantizers survive a save/load round trip
+
+import numpy as np
+
+from vector_index import IVFIndex
+from vector_store import VectorStore
+
+def _store(tmp_path, rows_per_category=40, dim=8):
+    rng = np.random.default_rng(0)
+    store = VectorStore(str(tmp_path / "db"), fsync=False)
+    store.create(dim)
+    for category in ("kharch", "udhaar"):
+        records = [{"category": category, "user_text": f"{category} {i}", "model_response": "ok"} for i in range(rows_per_category)]
+        store.append(records, rng.normal(size=(rows_per_category, dim)))
+    return store
+
+def test_ivf_round_trip_without_pickle(tmp_path):
+    store = _store(tmp_path)
+    path = str(tmp_path / "db.ivf.npz")
+    built = IVFIndex.from_store(store, path=path, min_train_size=16)
+    with np.load(path, allow_pickle=False) as saved:
+        assert saved["categories"].dtype.kind == "U"
+        assert saved["categories"].tolist() == ["kharch", "udhaar"]
+
+    loaded = IVFIndex.from_store(store, path=path, min_train_size=16)
+    query = store.embeddings[3]
+    for category in ("kharch", "udhaar"):
+        np.testing.assert_array_equal(loaded._trained[category]["centroids"], built._trained[category]["centroids"])
+        assert loaded.search(category, query, 5)[0].tolist() == built.search(category, query, 5)[0].tolist()
@@ -0,0 +1,64 @@
+# Tests for vector_store.py: appends, failed-append rollback and crash recovery
+
+import os
+
+import numpy as np
+import pytest
+
+from vector_store import VectorStore
+
+def _records(count, start=0):
+    return [{"category": "c", "user_text": f"story {i}", "model_response": ""} for i in range(start, start + count)]
+
+def _store(tmp_path):
+    store = VectorStore(str(tmp_path / "db"), fsync=False)
+    store.create(4)
+    store.append(_records(2), np.ones((2, 4)))
+    return store
+
+def _assert_aligned(store, count):
+    assert len(store) == count
+    assert os.path.getsize(store.vectors_path) == count * 4 * 4
+    with open(store.meta_path, encoding="utf-8") as f:
+        assert len(f.readlines()) == count + 1
+    reloaded = VectorStore(store.base_path)
+    reloaded.load()
+    assert len(reloaded) == count
+
+def test_append_and_reload(tmp_path):
+    store = _store(tmp_path)
+    assert store.append(_records(3, 2), np.zeros((3, 4))) == [2, 3, 4]
+    _assert_aligned(store, 5)
+    assert store.get_record(4)["user_text"] == "story 4"
+
+def test_failed_metadata_write_rolls_back_vectors(tmp_path):
+    store = _store(tmp_path)
+    bad = _records(2, 2)
+    bad[1]["user_text"] = object()
+    with pytest.raises(TypeError):
+        store.append(bad, np.zeros((2, 4)))
+    _assert_aligned(store, 2)
+    # The next append lines up with its own metadata again
+    assert store.append(_records(1, 2), np.full((1, 4), 2.0)) == [2]
+    _assert_aligned(store, 3)
+    assert np.asarray(store.embeddings[2]).tolist() == [2.0] * 4
+
+def test_failed_manifest_write_rolls_back_both_files(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+
+    def fail(count):
+        raise OSError("disk full")
+    monkeypatch.setattr(store, "_write_manifest", fail)
+    with pytest.raises(OSError):
+        store.append(_records(2, 2), np.zeros((2, 4)))
+    _assert_aligned(store, 2)
+
+def test_load_drops_uncommitted_tail(tmp_path):
+    store = _store(tmp_path)
+    with open(store.vectors_path, "ab") as f:
+        f.write(np.zeros((1, 4), dtype=np.float32).tobytes())
+    with open(store.meta_path, "a", encoding="utf-8") as f:
+        f.write('{"category": "c", "user_text": "torn", "model_response": ""}\n')
+    reloaded = VectorStore(store.base_path)
+    reloaded.load()
+    _assert_aligned(reloaded, 2)
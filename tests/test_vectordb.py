@@ -0,0 +1,46 @@
+# Tests for vectordb.py: the classifier centroid sums stay in step with the store
+
+import threading
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from vectordb import QueryContext
+
+def _counted_rows(vectordb) -> int:
+    return sum(count for _, count in vectordb._category_sums.values())
+
+def test_commits_are_folded_into_centroids_exactly_once(fresh_db, monkeypatch):
+    fresh_db.ensure_vector_db()
+    fresh_db._get_category_centroids()
+    stories = [f"Maine dukaan par {100 * (i + 1)} rupaye diye" for i in range(20)]
+    # Learned rows never count, so commit labelled rows to see the fold at work
+    real_append = fresh_db.hissab_db.append
+    monkeypatch.setattr(fresh_db.hissab_db, "append", lambda records, embeddings: real_append(
+        [dict(record, model_response="**Kul Kharch**") for record in records], embeddings))
+
+    def commit(batch):
+        fresh_db.add_user_prompts_to_db(batch, [QueryContext(text, category="personal_expense_tracking") for text in batch])
+
+    threads = [threading.Thread(target=commit, args=(stories[i::4],)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    # Classify while the commits land: centroid reads must not double-count the new rows
+    for _ in range(20):
+        fresh_db._get_category_centroids()
+    for thread in threads:
+        thread.join()
+
+    fresh_db._get_category_centroids()
+    assert _counted_rows(fresh_db) == len(fresh_db.hissab_db) == len(fresh_db.INITIAL_PROMPTS) + len(stories)
+
+def test_learned_rows_do_not_move_centroids(fresh_db):
+    fresh_db.ensure_vector_db()
+    _, before = fresh_db._get_category_centroids()
+    # The classifier's own guesses, stored without a response, must not feed back into it
+    stories = [f"Rohit ne Suman ko {100 * (i + 1)} diye" for i in range(10)]
+    fresh_db.add_user_prompts_to_db(stories, [QueryContext(text, category="salary_calculation") for text in stories])
+
+    assert fresh_db._get_category_centroids()[1].tolist() == before.tolist()
+    assert _counted_rows(fresh_db) == len(fresh_db.INITIAL_PROMPTS)
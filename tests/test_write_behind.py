@@ -0,0 +1,43 @@
+# Tests for write_behind.py: batching, flush and drops when full
+
+import threading
+import time
+
+from write_behind import WriteBehindQueue
+
+def test_flush_waits_for_every_item():
+    committed = []
+    writes = WriteBehindQueue(committed.extend, batch_size=8, flush_interval_ms=5)
+    for i in range(50):
+        assert writes.submit(i)
+    assert writes.flush(timeout=5)
+    assert sorted(committed) == list(range(50))
+    assert writes.metrics()["committed"] == 50
+
+def test_flush_times_out_while_a_commit_is_stuck():
+    release = threading.Event()
+    writes = WriteBehindQueue(lambda batch: release.wait(5), flush_interval_ms=1)
+    writes.submit("x")
+    assert not writes.flush(timeout=0.05)
+    release.set()
+    assert writes.flush(timeout=5)
+
+def test_full_queue_drops_and_does_not_block_flush():
+    release = threading.Event()
+    writes = WriteBehindQueue(lambda batch: release.wait(5), max_size=1, batch_size=1, flush_interval_ms=1)
+    writes.submit("in flight")
+    while writes.metrics()["queue_depth"]:
+        time.sleep(0.001)
+    assert writes.submit("queued")
+    assert not writes.submit("dropped")
+    release.set()
+    assert writes.flush(timeout=5)
+    assert writes.metrics()["dropped"] == 1
+
+def test_failed_commit_still_counts_as_done():
+    def commit(batch):
+        raise RuntimeError("disk full")
+    writes = WriteBehindQueue(commit, flush_interval_ms=1)
+    writes.submit("x")
+    assert writes.flush(timeout=5)
+    assert writes.metrics()["failed"] == 1
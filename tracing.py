@@ -0,0 +1,136 @@
+# tracing.py - Per-Stage Latency Tracing and Metrics
+#
+# Stages timed along the query path (see STAGES): classification, embedding, retrieval, prompt
+# assembly, LLM time-to-first-token and total generation, DB write, STT, TTS, plus the total
+# per query.
+#
+# Every timing lands in an in-process rolling window per stage; metrics_snapshot() turns those
+# into count / mean / p50 / p95 / p99. A request can also carry a Trace (QueryContext.trace),
+# which collects its own stage timings and, when finished, emits one structured JSON log line:
+#
+#   {"event": "query", "trace_id": "...", "path": "llm", "stages_ms": {...}, "prompt_tokens": 412, ...}
+#
+# Logging (HISSAB_TRACE_LOG): unset = off, "stderr" = standard error, anything else = a file
+# path the JSON lines are appended to. The log goes through the "hissab.trace" logger.
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+TRACE_LOG = os.getenv("HISSAB_TRACE_LOG", "")
+# Samples kept per stage for the percentiles
+TRACE_WINDOW = int(os.getenv("HISSAB_TRACE_WINDOW", "2048"))
+
+STAGES = ("stt", "embedding", "classification", "retrieval", "prompt_assembly", "ttft", "generation",
+          "db_write", "tts", "total")
+
+logger = logging.getLogger("hissab.trace")
+if TRACE_LOG:
+    _handler = logging.StreamHandler() if TRACE_LOG == "stderr" else logging.FileHandler(TRACE_LOG, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_samples = {}
+_samples_lock = threading.Lock()
+
+def record(stage: str, ms: float):
+    """Adds one timing (milliseconds) for `stage` to the process-wide metrics."""
+    with _samples_lock:
+        if stage not in _samples:
+            _samples[stage] = deque(maxlen=TRACE_WINDOW)
+        _samples[stage].append(ms)
+
+@contextmanager
+def span(stage: str, trace: "Trace" = None):
+    """Times the block as `stage`, on `trace` if one is given, else only in the global metrics."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        if trace is not None:
+            trace.record(stage, ms)
+        else:
+            record(stage, ms)
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(q / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def rss_mb() -> float:
+    """Resident memory of this process in MB (used by the benchmarks)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak rather than current RSS, but the best that is portable
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def metrics_snapshot() -> dict:
+    """{stage: {count, mean_ms, p50_ms, p95_ms, p99_ms}} over the rolling window, in STAGES order."""
+    with _samples_lock:
+        samples = {stage: sorted(values) for stage, values in _samples.items()}
+    order = [s for s in STAGES if s in samples] + sorted(s for s in samples if s not in STAGES)
+    snapshot = {}
+    for stage in order:
+        values = samples[stage]
+        snapshot[stage] = {
+            "count": len(values),
+            "mean_ms": round(sum(values) / len(values), 2),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+        }
+    return snapshot
+
+def reset_metrics():
+    with _samples_lock:
+        _samples.clear()
+
+class Trace:
+    """Stage timings and attributes of one request; finish() logs it as one JSON line."""
+
+    def __init__(self, name: str = "query", **attrs):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.attrs = dict(attrs)
+        self.stages = {}
+        self._start = time.perf_counter()
+        self._finished = False
+
+    def record(self, stage: str, ms: float):
+        # A stage can run more than once per request (e.g. retries); report the sum
+        self.stages[stage] = self.stages.get(stage, 0.0) + ms
+        record(stage, ms)
+
+    def span(self, stage: str):
+        return span(stage, self)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def finish(self, **attrs) -> dict:
+        """Records the total, emits the structured log line once, and returns it as a dict."""
+        self.attrs.update(attrs)
+        if not self._finished:
+            self._finished = True
+            self.record("total", self.elapsed_ms())
+        event = {"event": self.name, "trace_id": self.trace_id, **self.attrs,
+                 "stages_ms": {stage: round(ms, 2) for stage, ms in self.stages.items()}}
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(event, ensure_ascii=False, default=str))
+        return event
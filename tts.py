@@ -0,0 +1,149 @@
+# tts.py - Text-to-Speech with a Content-Addressed MP3 Cache
+#
+# Spoken summaries repeat a lot ("Hisaab taiyaar hai.", the same settlement sentence for the
+# same story...). Each synthesized MP3 is stored under the SHA-256 of (text, lang, slow), so
+# a repeat is served from disk without calling gTTS. The cache lives in its own directory and
+# is bounded: the least recently used files are evicted beyond AUDIO_CACHE_MAX_FILES.
+#
+# Synthesis runs on a small background thread pool (synthesize_async), so callers can start
+# TTS while the detailed answer is still streaming.
+#
+# The voice follows the script of the text (see voice_for): Devanagari goes to the Hindi voice,
+# romanized Hinglish (what the app produces) to the Indian English voice. The Hindi voice
+# reads Latin-script text letter by letter or with English phonetics and mangles it.
+
+import glob
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+AUDIO_CACHE_DIR = os.getenv("HISSAB_AUDIO_CACHE_DIR", "audio_cache")
+AUDIO_CACHE_MAX_FILES = int(os.getenv("HISSAB_AUDIO_CACHE_MAX_FILES", "200"))
+TTS_WORKERS = int(os.getenv("HISSAB_TTS_WORKERS", "2"))
+# Voices as (gTTS lang, gTTS tld): Hindi for Devanagari, Indian English for romanized Hinglish
+DEVANAGARI_VOICE = ("hi", "co.in")
+ROMAN_VOICE = ("en", "co.in")
+_DEVANAGARI = re.compile(r"[\u0900-\u097F]")
+_RUPEE_AMOUNT = re.compile(r"₹\s*(\d[\d,]*(?:\.\d+)?)")
+
+def voice_for(text: str) -> tuple:
+    """(lang, tld) of the gTTS voice that pronounces `text` correctly."""
+    return DEVANAGARI_VOICE if _DEVANAGARI.search(text) else ROMAN_VOICE
+
+def speakable(text: str) -> str:
+    """Spells out what TTS voices read badly: "₹3,000" -> "3,000 rupaye"."""
+    return _RUPEE_AMOUNT.sub(r"\1 rupaye", text)
+
+def remove_legacy_audio_files(directory: str = ".") -> int:
+    """
+    Deletes the response_<uuid>.mp3 files the app used to write into the working directory
+    before the audio cache existed. Run once per process, when the cache is first created.
+    """
+    removed = 0
+    for path in glob.glob(os.path.join(directory, "response_*.mp3")):
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError as e:
+            print(f"Purani audio file '{path}' delete nahi ho payi: {e}")
+    if removed:
+        print(f"{removed} purani response_*.mp3 files hata di gayi.")
+    return removed
+
+class AudioCache:
+    """
+    Bounded, content-addressed MP3 cache. The directory is listed once at start-up; after
+    that the LRU order is tracked in memory, so lookups and evictions never rescan it.
+    """
+
+    def __init__(self, directory: str = AUDIO_CACHE_DIR, max_files: int = AUDIO_CACHE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._files = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+        existing = [f for f in os.listdir(directory) if f.endswith(".mp3")]
+        existing.sort(key=lambda f: os.path.getmtime(os.path.join(directory, f)))
+        for name in existing:
+            self._files[name] = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, lang: str, slow: bool) -> str:
+        return hashlib.sha256(f"{lang}|{int(slow)}|{text}".encode("utf-8")).hexdigest() + ".mp3"
+
+    def get(self, text: str, lang: str, slow: bool):
+        """Returns the cached MP3 path for this utterance, or None."""
+        name = self.key(text, lang, slow)
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            if name in self._files and os.path.exists(path):
+                self._files.move_to_end(name)
+                self.hits += 1
+                return path
+            self._files.pop(name, None)
+            self.misses += 1
+            return None
+
+    def put(self, text: str, lang: str, slow: bool, write) -> str:
+        """
+        Stores a new MP3 produced by `write(tmp_path)` and returns its final path. The file is
+        renamed into place only once complete, so readers never see a half-written MP3.
+        """
+        name = self.key(text, lang, slow)
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._files[name] = None
+            self._files.move_to_end(name)
+            while len(self._files) > self.max_files:
+                evicted, _ = self._files.popitem(last=False)
+                try:
+                    os.remove(os.path.join(self.directory, evicted))
+                except FileNotFoundError:
+                    pass
+        return path
+
+_cache = None
+_cache_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="hissab-tts")
+
+def get_audio_cache() -> AudioCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            remove_legacy_audio_files()
+            _cache = AudioCache()
+        return _cache
+
+def synthesize(text: str, lang: str = None, slow: bool = False) -> str:
+    """
+    Returns the path of an MP3 speaking `text`, from the cache when possible. Without `lang`
+    the voice is chosen from the script of the text (see voice_for).
+    """
+    with tracing.span("tts"):
+        lang, tld = (lang, "co.in") if lang else voice_for(text)
+        text = speakable(text)
+        voice = f"{lang}-{tld}"
+        cache = get_audio_cache()
+        path = cache.get(text, voice, slow)
+        if path:
+            return path
+        from gtts import gTTS
+        return cache.put(text, voice, slow, lambda tmp_path: gTTS(text=text, lang=lang, tld=tld, slow=slow).save(tmp_path))
+
+def synthesize_async(text: str, lang: str = None, slow: bool = False):
+    """Starts synthesize() on the TTS worker pool and returns its Future."""
+    return _executor.submit(synthesize, text, lang, slow)
+
+def submit(fn, *args, **kwargs):
+    """Runs any TTS-related job (e.g. summary generation + synthesis) on the worker pool."""
+    return _executor.submit(fn, *args, **kwargs)
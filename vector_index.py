@@ -0,0 +1,309 @@
+# vector_index.py - In-Memory Similarity Index for the Hissab Vector DB
+#
+# The vector store (vector_store.py) is the source of truth on disk. This module keeps the
+# search-ready copy in memory: one contiguous, pre-L2-normalized float32 matrix per category,
+# so a top-k query is a single matrix-vector product plus an argpartition, with no per-query
+# filtering, list-to-array conversion or re-normalization.
+#
+# Two backends share the same add()/search() interface (see make_index):
+#   "exact" - ExactIndex, brute force over the category matrix.
+#   "ivf"   - IVFIndex, an approximate inverted-file index (spherical k-means coarse
+#             quantizer per category) for DBs that have grown too large for brute force.
+
+import os
+
+import numpy as np
+
+_INITIAL_CAPACITY = 64
+
+def normalize(embeddings) -> np.ndarray:
+    """Returns float32 copies of the rows of `embeddings` scaled to unit length."""
+    embeddings = np.array(embeddings, dtype=np.float32, ndmin=2)
+    return embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12)
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the `top_k` highest scores, best first, without a full sort."""
+    if top_k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < len(scores):
+        candidates = np.argpartition(scores, -top_k)[-top_k:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+class ExactIndex:
+    """
+    Exact cosine-similarity index with one normalized matrix per category.
+
+    Each category's matrix is over-allocated and doubled when full, so inserts are amortized
+    O(dim) and the matrix stays contiguous for the dot product.
+    """
+
+    def __init__(self, dim: int, initial_capacity: int = _INITIAL_CAPACITY):
+        self.dim = dim
+        self.initial_capacity = initial_capacity
+        self._matrices = {}
+        self._row_ids = {}
+        self._sizes = {}
+
+    def __len__(self) -> int:
+        return sum(self._sizes.values())
+
+    def add(self, category: str, row_ids, embeddings):
+        """Adds store rows `row_ids` with their (unnormalized) `embeddings` to `category`."""
+        vectors = normalize(embeddings)
+        row_ids = np.asarray(row_ids, dtype=np.int64).reshape(-1)
+        size = self._sizes.get(category, 0)
+        needed = size + len(vectors)
+
+        matrix = self._matrices.get(category)
+        if matrix is None or needed > len(matrix):
+            capacity = max(self.initial_capacity, len(matrix) if matrix is not None else 0)
+            while capacity < needed:
+                capacity *= 2
+            grown = np.empty((capacity, self.dim), dtype=np.float32)
+            grown_ids = np.empty(capacity, dtype=np.int64)
+            if matrix is not None:
+                grown[:size] = matrix[:size]
+                grown_ids[:size] = self._row_ids[category][:size]
+            self._matrices[category] = matrix = grown
+            self._row_ids[category] = grown_ids
+
+        matrix[size:needed] = vectors
+        self._row_ids[category][size:needed] = row_ids
+        self._sizes[category] = needed
+
+    def search(self, category: str, query, top_k: int = 3) -> tuple:
+        """
+        Returns (row_ids, scores) of the `top_k` stored rows in `category` most similar to
+        `query`, best first.
+        """
+        size = self._sizes.get(category, 0)
+        if size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self._matrices[category][:size] @ normalize(query)[0]
+        best = top_k_indices(scores, top_k)
+        return self._row_ids[category][best], scores[best]
+
+    @classmethod
+    def from_store(cls, store, answered_only: bool = False) -> "ExactIndex":
+        """Builds the index with one pass over a VectorStore (only answered rows if `answered_only`)."""
+        index = cls(store.dim)
+        for category in store.categories():
+            rows = store.rows_for_category(category, answered_only=answered_only)
+            if len(rows):
+                index.add(category, rows, store.embeddings[rows])
+        return index
+
+    def get(self, category: str) -> tuple:
+        """Returns (row_ids, normalized matrix) views of everything stored under `category`."""
+        size = self._sizes.get(category, 0)
+        if size == 0:
+            return np.empty(0, dtype=np.int64), np.empty((0, self.dim), dtype=np.float32)
+        return self._row_ids[category][:size], self._matrices[category][:size]
+
+    def categories(self) -> list:
+        return list(self._sizes)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the matrices and row-id arrays, including unused capacity."""
+        return sum(m.nbytes for m in self._matrices.values()) + sum(r.nbytes for r in self._row_ids.values())
+
+def _spherical_kmeans(vectors: np.ndarray, num_lists: int, iterations: int, rng) -> np.ndarray:
+    """Trains `num_lists` unit-length centroids on already-normalized `vectors`."""
+    centroids = vectors[rng.choice(len(vectors), num_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        # Re-seed empty lists with random points so no centroid is wasted
+        empty = np.flatnonzero(~sums.any(axis=1))
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        centroids = normalize(sums)
+    return centroids
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+    """Nearest-centroid id for each normalized vector, computed in batches to bound memory."""
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), batch_size):
+        assignments[start:start + batch_size] = np.argmax(vectors[start:start + batch_size] @ centroids.T, axis=1)
+    return assignments
+
+class IVFIndex:
+    """
+    Approximate cosine-similarity index (inverted file) with per-category coarse quantizers.
+
+    Categories smaller than `min_train_size` are searched exactly. Once a category reaches that
+    size, spherical k-means splits it into ~sqrt(N) lists; inserts go to the nearest list in
+    O(num_lists * dim), and a query scans only the `nprobe` lists closest to it. A category is
+    retrained when it has grown `retrain_factor` times since its last training, which keeps
+    the lists balanced at amortized O(1) cost per insert.
+
+    The trained quantizers and list assignments are persisted to `path` (an .npz next to the
+    vector store) by save(); the vectors themselves are re-read from the store on load.
+    add() (and any training it triggers) stays in memory, so callers never hit the disk under
+    their search lock.
+    """
+
+    def __init__(self, dim: int, nprobe: int = 8, min_train_size: int = 4096,
+                 retrain_factor: float = 4.0, path: str = None, seed: int = 0):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_factor = retrain_factor
+        self.path = path
+        self.store_id = None
+        self._rng = np.random.default_rng(seed)
+        # Categories that are still small enough for brute force
+        self._untrained = ExactIndex(dim)
+        # category -> {"centroids": (L, dim), "lists": ExactIndex keyed by list id, "trained_size": int, "size": int}
+        self._trained = {}
+
+    def __len__(self) -> int:
+        return len(self._untrained) + sum(entry["size"] for entry in self._trained.values())
+
+    def add(self, category: str, row_ids, embeddings):
+        entry = self._trained.get(category)
+        if entry is None:
+            self._untrained.add(category, row_ids, embeddings)
+            row_ids, vectors = self._untrained.get(category)
+            if len(row_ids) >= self.min_train_size:
+                self._train(category, row_ids.copy(), vectors.copy())
+                self._untrained = self._without(self._untrained, category)
+            return
+
+        vectors = normalize(embeddings)
+        row_ids = np.asarray(row_ids, dtype=np.int64).reshape(-1)
+        self._add_to_lists(entry, row_ids, vectors)
+        if entry["size"] >= self.retrain_factor * entry["trained_size"]:
+            all_rows, all_vectors = self._collect(entry)
+            self._train(category, all_rows, all_vectors)
+
+    def search(self, category: str, query, top_k: int = 3) -> tuple:
+        entry = self._trained.get(category)
+        if entry is None:
+            return self._untrained.search(category, query, top_k)
+
+        query = normalize(query)[0]
+        probes = top_k_indices(entry["centroids"] @ query, self.nprobe)
+        candidate_rows, candidate_scores = [], []
+        for list_id in probes:
+            rows, scores = entry["lists"].search(int(list_id), query, top_k)
+            candidate_rows.append(rows)
+            candidate_scores.append(scores)
+        rows = np.concatenate(candidate_rows)
+        scores = np.concatenate(candidate_scores)
+        best = top_k_indices(scores, top_k)
+        return rows[best], scores[best]
+
+    # --- Training ---
+    def _train(self, category: str, row_ids: np.ndarray, vectors: np.ndarray, iterations: int = 10):
+        num_lists = int(np.clip(np.sqrt(len(vectors)), 8, 4096))
+        # k-means on a sample is enough for a coarse quantizer and keeps retraining cheap
+        sample_size = min(len(vectors), num_lists * 64)
+        sample = vectors[self._rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = _spherical_kmeans(sample, num_lists, iterations, self._rng)
+        self._install(category, centroids, row_ids, vectors, _assign(vectors, centroids))
+
+    def _install(self, category, centroids, row_ids, vectors, assignments):
+        entry = {"centroids": centroids, "lists": ExactIndex(self.dim), "trained_size": len(row_ids), "size": 0}
+        order = np.argsort(assignments, kind="stable")
+        boundaries = np.flatnonzero(np.diff(assignments[order])) + 1
+        for group in np.split(order, boundaries):
+            if len(group):
+                entry["lists"].add(int(assignments[group[0]]), row_ids[group], vectors[group])
+        entry["size"] = len(row_ids)
+        self._trained[category] = entry
+
+    def _add_to_lists(self, entry, row_ids, vectors):
+        assignments = _assign(vectors, entry["centroids"])
+        for row_id, vector, list_id in zip(row_ids, vectors, assignments):
+            entry["lists"].add(int(list_id), [row_id], vector)
+        entry["size"] += len(row_ids)
+
+    @staticmethod
+    def _collect(entry) -> tuple:
+        parts = [entry["lists"].get(list_id) for list_id in entry["lists"].categories()]
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    def _without(self, index: ExactIndex, category: str) -> ExactIndex:
+        remaining = ExactIndex(self.dim)
+        for other in index.categories():
+            if other != category:
+                row_ids, vectors = index.get(other)
+                remaining.add(other, row_ids, vectors)
+        return remaining
+
+    # --- Persistence ---
+    def save(self):
+        """Writes the trained quantizers and list assignments atomically to `self.path`."""
+        arrays = {"dim": np.array(self.dim), "store_id": np.array(self.store_id or ""),
+                  # Fixed-width unicode, so the file loads with allow_pickle=False
+                  "categories": np.array(list(self._trained), dtype=str)}
+        for i, entry in enumerate(self._trained.values()):
+            rows, assignments = [], []
+            for list_id in entry["lists"].categories():
+                list_rows, _ = entry["lists"].get(list_id)
+                rows.append(list_rows)
+                assignments.append(np.full(len(list_rows), list_id, dtype=np.int64))
+            arrays[f"centroids_{i}"] = entry["centroids"]
+            arrays[f"rows_{i}"] = np.concatenate(rows)
+            arrays[f"lists_{i}"] = np.concatenate(assignments)
+            arrays[f"trained_size_{i}"] = np.array(entry["trained_size"])
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def from_store(cls, store, path: str = None, answered_only: bool = False, **kwargs) -> "IVFIndex":
+        """
+        Loads the persisted quantizers from `path` if they belong to this store, otherwise
+        trains from scratch. Store rows appended since the last save are inserted incrementally.
+        With `answered_only`, rows without a model response are left out.
+        """
+        index = cls(store.dim, path=path, **kwargs)
+        index.store_id = store.store_id
+        covered = {}
+        if path and os.path.exists(path):
+            with np.load(path, allow_pickle=False) as saved:
+                try:
+                    categories = saved["categories"].tolist()
+                except ValueError:
+                    # Files from before the fixed-width format stored the names as a pickled array
+                    categories = None
+                if categories is not None and str(saved["store_id"]) == (store.store_id or "") and int(saved["dim"]) == store.dim:
+                    for i, category in enumerate(categories):
+                        rows, lists = saved[f"rows_{i}"], saved[f"lists_{i}"]
+                        if answered_only:
+                            keep = np.isin(rows, store.rows_for_category(category, answered_only=True))
+                            rows, lists = rows[keep], lists[keep]
+                        vectors = normalize(store.embeddings[rows])
+                        index._install(category, saved[f"centroids_{i}"], rows, vectors, lists)
+                        index._trained[category]["trained_size"] = int(saved[f"trained_size_{i}"])
+                        covered[category] = rows
+                else:
+                    print(f"ANN index '{path}' purane store ka hai, dobara banaya ja raha hai...")
+
+        for category in store.categories():
+            rows = store.rows_for_category(category, answered_only=answered_only)
+            if category in covered:
+                rows = np.setdiff1d(rows, covered[category], assume_unique=True)
+            if len(rows):
+                index.add(category, rows, store.embeddings[rows])
+        if path:
+            index.save()
+        return index
+
+def make_index(backend: str, store, path: str = None, answered_only: bool = False):
+    """
+    Builds the search index for `store` with the given backend ("exact" or "ivf"), over every
+    row or, with `answered_only`, over the rows that carry a model response.
+    """
+    if backend == "exact":
+        return ExactIndex.from_store(store, answered_only=answered_only)
+    if backend == "ivf":
+        return IVFIndex.from_store(store, path=path, answered_only=answered_only)
+    raise ValueError(f"Unknown index backend: {backend}")
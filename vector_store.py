@@ -0,0 +1,279 @@
+# vector_store.py - Append-Only, Memory-Mapped Storage for the Hissab Vector DB
+#
+# The DB is kept in two files that are only ever appended to:
+#   <base>.f32          - one contiguous row-major matrix of embeddings (no header), read back
+#                         lazily with np.memmap. Rows are float32 by default; float16 halves
+#                         and int8 quarters the file (see VectorStore._to_storage).
+#   <base>.meta.jsonl   - a header line ({"format", "dim", "dtype", "store_id"}) followed by one JSON record
+#                         (category / user_text / model_response) per embedding row.
+# plus a small commit manifest:
+#   <base>.manifest.json - {"store_id", "count"}: how many rows are committed. It is replaced
+#                          atomically (temp file + os.replace) after each append's data is
+#                          fsynced, so a multi-row append becomes visible all at once or not at
+#                          all; rows past the manifest count are rolled back on load.
+#
+# Adding a prompt is therefore O(1) disk I/O instead of rewriting the whole DB. Rows are never
+# modified in place; `compact()` rewrites both files offline (drops duplicates and any torn
+# tail left by a crash) and swaps them in with os.replace. Compaction renumbers rows, so it
+# also gives the store a new `store_id`; derived files such as a persisted ANN index record
+# the id they were built from and are rebuilt when it changes.
+#
+# Offline compaction:
+#   python vector_store.py compact hissab_vector_db [--dtype float16]
+
+import argparse
+import json
+import os
+import threading
+import uuid
+
+import numpy as np
+
+FORMAT_VERSION = 1
+STORAGE_DTYPES = ("float32", "float16", "int8")
+METADATA_FIELDS = ("category", "user_text", "model_response")
+
+class VectorStore:
+    """
+    Append-only vector store: a memory-mapped embedding matrix plus a metadata log.
+
+    Row `i` of `embeddings` belongs to record `i` of the metadata log. Row ids are stable
+    until the next `compact()`. `dtype` only applies to newly created stores; an existing
+    store keeps the dtype recorded in its header. `fsync=False` skips the per-append fsyncs
+    (bulk loads and benchmarks only; a crash can then lose recently committed rows).
+    """
+
+    def __init__(self, base_path: str, dtype: str = "float32", fsync: bool = True):
+        self.base_path = base_path
+        self.vectors_path = base_path + ".f32"
+        self.meta_path = base_path + ".meta.jsonl"
+        self.manifest_path = base_path + ".manifest.json"
+        self.dim = None
+        self.store_id = None
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported storage dtype: {dtype}")
+        self.dtype = np.dtype(dtype)
+        self.fsync = fsync
+        self._records = []
+        self._rows_by_category = {}
+        self._count = 0
+        self._mmap = None
+        self._lock = threading.Lock()
+
+    # --- Lifecycle ---
+    def exists(self) -> bool:
+        return os.path.exists(self.vectors_path) and os.path.exists(self.meta_path)
+
+    def create(self, dim: int):
+        """Creates an empty store for embeddings of size `dim`, replacing any existing files."""
+        self.dim = int(dim)
+        self.store_id = uuid.uuid4().hex
+        header = {"format": FORMAT_VERSION, "dim": self.dim, "dtype": self.dtype.name, "store_id": self.store_id}
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+        open(self.vectors_path, "wb").close()
+        self._records = []
+        self._rows_by_category = {}
+        self._count = 0
+        self._mmap = None
+        self._write_manifest(0)
+
+    def load(self):
+        """
+        Reads the metadata log and prepares the embedding file for lazy memory-mapping.
+        If a previous process crashed mid-append, the torn or uncommitted tail is truncated away.
+        """
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            lines = f.readlines()
+        if header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector store format: {header.get('format')}")
+        self.dim = int(header["dim"])
+        self.dtype = np.dtype(header["dtype"])
+        self.store_id = header.get("store_id")
+
+        # A record without its trailing newline was only partially written
+        if lines and not lines[-1].endswith("\n"):
+            lines.pop()
+        vector_rows = os.path.getsize(self.vectors_path) // self._row_bytes()
+        count = min(len(lines), vector_rows)
+        committed = self._read_manifest_count()
+        if committed is not None:
+            count = min(count, committed)
+
+        self._records = [json.loads(line) for line in lines[:count]]
+        self._rows_by_category = {}
+        for row, record in enumerate(self._records):
+            self._rows_by_category.setdefault(record["category"], []).append(row)
+        self._count = count
+        self._mmap = None
+
+        if count != len(lines) or count != vector_rows:
+            print(f"Vector store '{self.base_path}' mein adhoora record mila, {count} rows tak repair kiya ja raha hai.")
+            self._truncate_to(count)
+
+    def _truncate_to(self, count: int):
+        with open(self.vectors_path, "r+b") as f:
+            f.truncate(count * self._row_bytes())
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            header_line = f.readline()
+            lines = [f.readline() for _ in range(count)]
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            f.write(header_line)
+            f.writelines(lines)
+
+    def _read_manifest_count(self):
+        """Committed row count from the manifest, or None if there is no manifest for this store."""
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        # A manifest left over from before a compaction describes different files
+        if manifest.get("store_id") != self.store_id:
+            return None
+        return int(manifest["count"])
+
+    def _write_manifest(self, count: int):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"store_id": self.store_id, "count": count}, f)
+            self._sync(f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _sync(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def _row_bytes(self) -> int:
+        return self.dim * self.dtype.itemsize
+
+    # --- Reads ---
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """
+        The (N, dim) embedding matrix, memory-mapped read-only on first access, in the storage
+        dtype. int8 rows are scaled unit vectors, which is fine for cosine similarity; use
+        np.asarray(..., dtype=np.float32) and normalize before any other kind of math.
+        """
+        if self._mmap is None:
+            if self._count == 0:
+                return np.empty((0, self.dim), dtype=self.dtype)
+            self._mmap = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(self._count, self.dim))
+        return self._mmap
+
+    def release_mapping(self):
+        """
+        Unmaps the embedding file, e.g. once its rows have been copied into an in-memory index.
+        The next access to `embeddings` maps it again.
+        """
+        self._mmap = None
+
+    def categories(self) -> list:
+        """Returns the distinct categories in insertion order."""
+        return list(self._rows_by_category)
+
+    def rows_for_category(self, category: str, answered_only: bool = False) -> np.ndarray:
+        """Row ids in `category`; with `answered_only`, only rows that carry a model response."""
+        rows = self._rows_by_category.get(category, [])
+        if answered_only:
+            rows = [row for row in rows if self._records[row]["model_response"]]
+        return np.asarray(rows, dtype=np.int64)
+
+    def get_record(self, row: int) -> dict:
+        return self._records[row]
+
+    # --- Writes ---
+    def append(self, records: list, embeddings) -> list:
+        """
+        Appends records and their embeddings to the end of the store and returns their row ids.
+        The call is one atomic commit: vectors and metadata are written and fsynced first, then
+        the manifest is swapped in, so a crash before that point rolls the whole batch back. If
+        any write raises, both files are truncated back to the committed rows before re-raising.
+        """
+        embeddings = self._to_storage(embeddings, len(records))
+        with self._lock:
+            try:
+                with open(self.vectors_path, "ab") as f:
+                    f.write(embeddings.tobytes())
+                    self._sync(f)
+                with open(self.meta_path, "a", encoding="utf-8") as f:
+                    for record in records:
+                        f.write(json.dumps({key: record.get(key, "") for key in METADATA_FIELDS}, ensure_ascii=False) + "\n")
+                    self._sync(f)
+                self._write_manifest(self._count + len(records))
+            except BaseException:
+                # Cut both files back to the committed rows so they stay aligned for the next
+                # append; if even that fails, load() repairs them from the manifest
+                try:
+                    self._truncate_to(self._count)
+                except OSError as e:
+                    print(f"Vector store '{self.base_path}' ka adhoora append hataya nahi ja saka: {e}")
+                raise
+
+            first_row = self._count
+            for offset, record in enumerate(records):
+                self._records.append({key: record.get(key, "") for key in METADATA_FIELDS})
+                self._rows_by_category.setdefault(record["category"], []).append(first_row + offset)
+            self._count += len(records)
+            # The old mapping has the old shape; remap lazily on next read
+            self._mmap = None
+        return list(range(first_row, self._count))
+
+    def _to_storage(self, embeddings, count: int) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(count, self.dim)
+        if self.dtype == np.int8:
+            # int8 keeps only the direction: each row is L2-normalized and scaled to [-127, 127]
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
+            embeddings = np.clip(np.rint(embeddings / norms * 127), -127, 127)
+        return np.ascontiguousarray(embeddings, dtype=self.dtype)
+
+    # --- Maintenance ---
+    def compact(self, dtype: str = None) -> int:
+        """
+        Rewrites the store without duplicate prompts (same category and text; the entry that has
+        a model response, else the newest one, wins) and swaps the new files in with os.replace.
+        Passing `dtype` also converts the stored vectors (e.g. to "float16" or "int8").
+        Meant to be run offline, while no other process is appending. Returns the number of rows removed.
+        """
+        with self._lock:
+            keep = {}
+            for row, record in enumerate(self._records):
+                key = (record["category"], " ".join(record["user_text"].lower().split()))
+                previous = keep.get(key)
+                if previous is None or record["model_response"] or not self._records[previous]["model_response"]:
+                    keep[key] = row
+            rows = sorted(keep.values())
+
+            tmp = VectorStore(self.base_path + ".compact", dtype=dtype or self.dtype.name)
+            tmp.create(self.dim)
+            tmp.append([self._records[row] for row in rows], np.asarray(self.embeddings[rows], dtype=np.float32))
+
+            removed = self._count - len(rows)
+            self._mmap = None
+            os.replace(tmp.vectors_path, self.vectors_path)
+            os.replace(tmp.meta_path, self.meta_path)
+            # Last: until now the old manifest's store_id no longer matches, so it is ignored
+            os.replace(tmp.manifest_path, self.manifest_path)
+        self.load()
+        return removed
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance for the append-only vector store.")
+    parser.add_argument("command", choices=["compact"])
+    parser.add_argument("base_path", help="Store path without extension, e.g. hissab_vector_db")
+    parser.add_argument("--dtype", choices=STORAGE_DTYPES, help="Convert the stored vectors to this dtype.")
+    args = parser.parse_args()
+
+    store = VectorStore(args.base_path)
+    store.load()
+    before = len(store)
+    removed = store.compact(dtype=args.dtype)
+    print(f"Compaction poora hua: {before} -> {len(store)} rows ({removed} hataye gaye), dtype={store.dtype.name}.")
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,149 @@
 # vectordb.py - Vector Database and Semantic Search Engine
+#
+# Heavy dependencies (sentence_transformers/torch via embeddings.py, pandas, google.generativeai) are imported
+# lazily inside the functions that need them, and the embedding model and DB are loaded once
+# per process on first use (see get_embedding_model / ensure_vector_db / warm_up), so
+# importing this module is cheap.
 import os
-import pandas as pd
+import threading
+from dataclasses import dataclass
 import numpy as np
-import google.generativeai as genai
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 from dotenv import load_dotenv
 
+from embeddings import load_embedding_model
+from llm_client import get_llm_client
+from shards import ShardManager
+import tracing
+from vector_index import make_index, normalize
+from vector_store import VectorStore
+from write_behind import WriteBehindQueue
+
 load_dotenv()
 
 # --- Configuration ---
+# Legacy whole-file pickle DB; only read once to migrate it into the vector store below
 DB_FILE_PATH = "hissab_vector_db.pkl"
+# Append-only store: <base>.f32 (memory-mapped embeddings) + <base>.meta.jsonl (metadata log)
+STORE_BASE_PATH = os.getenv("HISSAB_STORE_PATH", "hissab_vector_db")
+# Retrieval backend: "exact" (brute force per category) or "ivf" (approximate, for very large DBs).
+# The ivf quantizers are persisted next to the store files.
+INDEX_BACKEND = os.getenv("HISSAB_INDEX_BACKEND", "exact")
+INDEX_FILE_PATH = STORE_BASE_PATH + ".ivf.npz"
 MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+# How the embedding model runs: "torch" (default), "onnx" (ONNX Runtime) or "int8" (quantized)
+EMBEDDING_BACKEND = os.getenv("HISSAB_EMBEDDING_BACKEND", "torch")
+# dtype of the vectors in a newly created store: "float32", "float16" or "int8"
+VECTOR_DTYPE = os.getenv("HISSAB_VECTOR_DTYPE", "float32")
+
+# --- Category Classifier Configuration ---
+# "local": classify with the embedding model against per-category centroids and only
+#          ask Gemini when the local guess is ambiguous.
+# "llm":   always ask Gemini (the original behaviour).
+CLASSIFIER_MODE = os.getenv("HISSAB_CLASSIFIER_MODE", "local")
+# The local guess is trusted only if its cosine similarity to the best centroid is at least
+# this high AND it beats the runner-up category by at least the margin below.
+CLASSIFIER_MIN_SIMILARITY = float(os.getenv("HISSAB_CLASSIFIER_MIN_SIMILARITY", "0.45"))
+CLASSIFIER_MIN_MARGIN = float(os.getenv("HISSAB_CLASSIFIER_MIN_MARGIN", "0.05"))
+DEFAULT_CATEGORY = "personal_expense_tracking"
+
+# --- Self-Learning Write Configuration ---
+# New prompts are queued and committed in batches by a background worker ("1"), or written
+# synchronously inside the request ("0").
+WRITE_BEHIND_ENABLED = os.getenv("HISSAB_WRITE_BEHIND", "1") != "0"
+WRITE_QUEUE_SIZE = int(os.getenv("HISSAB_WRITE_QUEUE_SIZE", "1000"))
+WRITE_BATCH_SIZE = int(os.getenv("HISSAB_WRITE_BATCH_SIZE", "64"))
+WRITE_FLUSH_MS = float(os.getenv("HISSAB_WRITE_FLUSH_MS", "250"))
 
 # --- Global Variables ---
-# Load the embedding model once and store it in memory
-embedding_model = SentenceTransformer(MODEL_NAME)
-# The database will be loaded into this DataFrame
+# The embedding model is loaded once per process, on first use (see get_embedding_model)
+_embedding_model = None
+_model_lock = threading.Lock()
+# The database will be loaded into this VectorStore (see ensure_vector_db)
 hissab_db = None
+_db_lock = threading.Lock()
+# Search index over the answered rows of hissab_db (see INDEX_BACKEND): the few-shot examples.
+# Learned shared rows carry no response, so they never enter it and cannot crowd out examples.
+_index = None
+# Guards _index and the classifier sums. Held only to fold already-durable rows in, never
+# across disk I/O, so a commit's fsyncs do not stall retrieval or classification
+_index_lock = threading.RLock()
+# Background committer for add_user_prompt_to_db (see WRITE_BEHIND_ENABLED)
+_write_queue = None
+_write_queue_lock = threading.Lock()
+# Per-user shards of learned prompts (see shards.py); the shared store keeps the seed examples
+_shards = None
+_shards_lock = threading.Lock()
+# Per-category running sums of L2-normalized embeddings: {category: [sum_vector, count]}.
+# Only labelled rows (seed examples and rows with a reviewed response) count: a learned row's
+# category came from the classifier itself, and feeding it back would let the centroids drift
+# towards their own mistakes. Kept up to date on insert so the classifier never rescans the DB.
+_category_sums = None
+# Watermark: store rows [0, _summed_rows) are already folded into _category_sums
+_summed_rows = 0
+# Cached (category names, L2-normalized centroid matrix) derived from _category_sums
+_category_centroids = None
+# Queries that broke the single-pass invariant (see QueryContext.check_budget)
+_budget_violations = 0
+_budget_lock = threading.Lock()
+
+# --- Per-Request Context ---
+@dataclass
+class QueryContext:
+    """
+    Carries everything computed about one user query through the whole request
+    (classification -> retrieval -> generation -> DB write) so that the expensive
+    steps run at most once per query.
+    """
+    user_text: str
+    embedding: np.ndarray = None
+    category: str = None
+    # Whose history to search and learn into (None: shared store only)
+    user_id: str = None
+    # Instrumentation: how many times each expensive step actually ran for this query
+    encode_calls: int = 0
+    classify_calls: int = 0
+    # Size of the prompt sent to the LLM (estimated tokens) and how many examples it carried
+    prompt_tokens: int = None
+    prompt_examples: int = 0
+    # Optional tracing.Trace that collects this query's per-stage timings
+    trace: tracing.Trace = None
+
+    def get_embedding(self) -> np.ndarray:
+        """Encodes the query on first use and reuses the result afterwards."""
+        if self.embedding is None:
+            with tracing.span("embedding", self.trace):
+                self.embedding = get_embedding_model().encode([self.user_text])[0]
+            self.encode_calls += 1
+        return self.embedding
+
+    def get_category(self) -> str:
+        """Classifies the query on first use and reuses the result afterwards."""
+        if self.category is None:
+            # Encode outside the span so classification time is reported on its own
+            self.get_embedding()
+            with tracing.span("classification", self.trace):
+                self.category = get_category_from_prompt(self.user_text, context=self)
+            self.classify_calls += 1
+        return self.category
+
+    def check_budget(self) -> bool:
+        """
+        Checks the single-pass invariant (one encode and one classification per query). A
+        violation is counted and logged, never raised: the answer is already on its way.
+        """
+        if self.encode_calls <= 1 and self.classify_calls <= 1:
+            return True
+        global _budget_violations
+        with _budget_lock:
+            _budget_violations += 1
+        print(f"⚠️ Query budget toota: {self.encode_calls} encode, {self.classify_calls} classification calls "
+              f"('{self.user_text[:40]}')")
+        return False
+
+def budget_violations() -> int:
+    """Number of queries so far that encoded or classified more than once."""
+    with _budget_lock:
+        return _budget_violations
 
 # --- Initial Data Prompts (10 Refined Categories) ---
 INITIAL_PROMPTS = [
@@ -73,49 +199,181 @@ INITIAL_PROMPTS = [
     }
 ]
 
-def _initialize_database():
+def get_embedding_model():
+    """
+    Returns the process-wide embedding model (see EMBEDDING_BACKEND), loading it on first use.
+    Concurrent first callers wait for a single load instead of loading it twice.
+    """
+    global _embedding_model
+    if _embedding_model is None:
+        with _model_lock:
+            if _embedding_model is None:
+                print(f"Embedding model '{MODEL_NAME}' ({EMBEDDING_BACKEND}) load ho raha hai...")
+                _embedding_model = load_embedding_model(MODEL_NAME, EMBEDDING_BACKEND)
+    return _embedding_model
+
+def ensure_vector_db():
+    """Loads the vector DB on first use (thread-safe) and returns it."""
+    if hissab_db is None:
+        with _db_lock:
+            if hissab_db is None:
+                setup_vector_db()
+    return hissab_db
+
+def warm_up():
+    """
+    Loads the embedding model and the vector DB and runs one dummy encode, so the first real
+    query does not pay for any of it.
+    """
+    ensure_vector_db()
+    get_embedding_model().encode(["warm up"])
+
+def start_background_warmup() -> threading.Thread:
+    """Runs warm_up() on a daemon thread; queries that arrive meanwhile wait for the same load."""
+    thread = threading.Thread(target=warm_up, name="hissab-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def _initialize_database() -> VectorStore:
     """
     Creates the initial vector database from the hardcoded prompts,
-    generates embeddings, and saves it to a file.
+    generates embeddings, and saves it to the vector store files.
     """
     print("Vector DB banaya ja raha hai...")
-    df = pd.DataFrame(INITIAL_PROMPTS)
     # Generate embeddings for each user_text
-    embeddings = embedding_model.encode(df['user_text'].tolist(), show_progress_bar=True)
-    df['embedding'] = list(embeddings)
-    df.to_pickle(DB_FILE_PATH)
-    print(f"Vector DB '{DB_FILE_PATH}' mein save ho gaya hai.")
-    return df
+    embeddings = get_embedding_model().encode([p['user_text'] for p in INITIAL_PROMPTS], show_progress_bar=True)
+    store = VectorStore(STORE_BASE_PATH, dtype=VECTOR_DTYPE)
+    store.create(embeddings.shape[1])
+    store.append(INITIAL_PROMPTS, embeddings)
+    print(f"Vector DB '{STORE_BASE_PATH}' mein save ho gaya hai.")
+    return store
+
+def _migrate_pickle_database() -> VectorStore:
+    """
+    One-time import of the legacy pickle DB (a DataFrame with an 'embedding' column)
+    into the append-only vector store.
+    """
+    print(f"Purani pickle DB '{DB_FILE_PATH}' ko vector store mein migrate kiya ja raha hai...")
+    import pandas as pd
+    df = pd.read_pickle(DB_FILE_PATH)
+    embeddings = np.array(df['embedding'].tolist(), dtype=np.float32)
+    store = VectorStore(STORE_BASE_PATH, dtype=VECTOR_DTYPE)
+    store.create(embeddings.shape[1])
+    store.append(df[['category', 'user_text', 'model_response']].fillna('').to_dict(orient='records'), embeddings)
+    print(f"{len(store)} rows migrate ho gayi hain.")
+    return store
 
 def setup_vector_db():
     """
     Loads the vector database from the file if it exists, otherwise initializes it.
-    This is called once when the main app starts.
+    Normally called once per process through ensure_vector_db().
     """
-    global hissab_db
-    if os.path.exists(DB_FILE_PATH):
-        print(f"Pehle se bani hui Vector DB '{DB_FILE_PATH}' se load ho rahi hai...")
-        hissab_db = pd.read_pickle(DB_FILE_PATH)
+    global hissab_db, _index, _category_sums, _category_centroids
+    store = VectorStore(STORE_BASE_PATH)
+    if store.exists():
+        print(f"Pehle se bani hui Vector DB '{STORE_BASE_PATH}' se load ho rahi hai...")
+        store.load()
+    elif os.path.exists(DB_FILE_PATH):
+        store = _migrate_pickle_database()
     else:
         print("Pehli baar setup kiya ja raha hai...")
-        hissab_db = _initialize_database()
+        store = _initialize_database()
+    _index = make_index(INDEX_BACKEND, store, path=INDEX_FILE_PATH, answered_only=True)
+    _category_sums = None
+    _category_centroids = None
+    # Published last: ensure_vector_db() treats a non-None hissab_db as fully loaded
+    hissab_db = store
 
-def get_category_from_prompt(user_prompt: str) -> str:
+def _get_category_centroids():
     """
-    Uses the Gemini model to classify the user's prompt into one of the predefined categories.
+    Returns (categories, centroids) where each row of `centroids` is the L2-normalized mean
+    embedding of the labelled rows of one category in the DB. The per-category sums are built
+    with one pass over the DB on first use and then updated incrementally by `_fold_new_rows`.
     """
-    if not user_prompt:
-        return "unknown"
-        
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("Error: Google API Key missing.")
+    global _category_sums, _category_centroids, _summed_rows
+    ensure_vector_db()
+    with _index_lock:
+        if _category_sums is None:
+            _category_sums = {}
+            # Rows appended while the sums are built are left to _fold_new_rows
+            embeddings = hissab_db.embeddings
+            end = min(len(hissab_db), len(embeddings))
+            for category in hissab_db.categories():
+                rows = hissab_db.rows_for_category(category, answered_only=True)
+                rows = rows[rows < end]
+                if len(rows):
+                    # Normalize each example first so long and short prompts get equal weight
+                    vectors = normalize(embeddings[rows])
+                    _category_sums[category] = [vectors.sum(axis=0), len(vectors)]
+            _summed_rows = end
+            _category_centroids = None
+        _fold_new_rows()
+        if _category_centroids is None:
+            categories = sorted(_category_sums)
+            centroids = normalize([_category_sums[c][0] / _category_sums[c][1] for c in categories])
+            _category_centroids = (categories, centroids)
+        return _category_centroids
+
+def _fold_new_rows():
+    """
+    Folds the labelled store rows appended since the watermark into the classifier sums in
+    O(rows * dim) and advances the watermark, so every row is considered exactly once whichever
+    thread gets here first. Caller holds _index_lock.
+    """
+    global _category_centroids, _summed_rows
+    if _category_sums is None:
+        return
+    embeddings = hissab_db.embeddings
+    end = min(len(hissab_db), len(embeddings))
+    if end <= _summed_rows:
+        return
+    by_category = {}
+    for row in range(_summed_rows, end):
+        record = hissab_db.get_record(row)
+        if record['model_response']:
+            by_category.setdefault(record['category'], []).append(row)
+    for category, rows in by_category.items():
+        entry = _category_sums.setdefault(category, [np.zeros(hissab_db.dim, dtype=np.float32), 0])
+        entry[0] = entry[0] + normalize(embeddings[rows]).sum(axis=0)
+        entry[1] += len(rows)
+    _summed_rows = end
+    _category_centroids = None
 
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
+def classify_locally(embedding) -> tuple:
+    """
+    Classifies a prompt embedding against the category centroids without any network call.
+
+    Returns:
+        (category, similarity, margin) where `similarity` is the cosine similarity to the best
+        centroid and `margin` is how far ahead of the runner-up category it is.
+    """
+    categories, centroids = _get_category_centroids()
+    query = np.asarray(embedding, dtype=np.float32)
+    query = query / (np.linalg.norm(query) + 1e-12)
+    scores = centroids @ query
+
+    if len(categories) == 1:
+        return categories[0], float(scores[0]), float(scores[0])
+
+    second, best = np.argpartition(scores, -2)[-2:]
+    if scores[second] > scores[best]:
+        best, second = second, best
+    return categories[best], float(scores[best]), float(scores[best] - scores[second])
+
+def is_confident(similarity: float, margin: float) -> bool:
+    """
+    Decides whether a local classification is trustworthy enough to skip the LLM.
+    """
+    return similarity >= CLASSIFIER_MIN_SIMILARITY and margin >= CLASSIFIER_MIN_MARGIN
+
+def get_category_from_llm(user_prompt: str) -> str:
+    """
+    Uses the Gemini model to classify the user's prompt into one of the predefined categories.
+    """
+    client = get_llm_client()
 
     # Get a unique list of categories from our DB
-    category_list = hissab_db['category'].unique().tolist()
+    category_list = ensure_vector_db().categories()
     
     # Create a specific prompt for the classification task
     classification_prompt = f"""
@@ -130,66 +388,181 @@ def get_category_from_prompt(user_prompt: str) -> str:
     """
     
     try:
-        response = model.generate_content(classification_prompt)
         # Clean up the response to get only the category name
-        category = response.text.strip().lower()
+        category = client.generate(classification_prompt).strip().lower()
         # Ensure the model returns a valid category
         if category in category_list:
             return category
         else:
             # Fallback if the model returns something unexpected
-            return "personal_expense_tracking"
+            return DEFAULT_CATEGORY
     except Exception as e:
         print(f"Category pata karte samay error aaya: {e}")
         # Default to a general category on error
-        return "personal_expense_tracking"
+        return DEFAULT_CATEGORY
+
+def get_category_from_prompt(user_prompt: str, mode: str = None, context: QueryContext = None) -> str:
+    """
+    Classifies the user's prompt into one of the predefined categories.
+
+    In "local" mode the prompt is matched against the category centroids of the embedding
+    model, and Gemini is only called when that guess is ambiguous. In "llm" mode Gemini is
+    always used. If a `context` is given, its cached embedding is reused instead of encoding
+    the prompt again.
+    """
+    if not user_prompt:
+        return "unknown"
 
+    mode = mode or CLASSIFIER_MODE
+    if mode == "llm":
+        return get_category_from_llm(user_prompt)
 
-def find_similar_prompts(user_prompt: str, category: str, top_k: int = 3) -> list:
+    if context is not None:
+        embedding = context.get_embedding()
+    else:
+        embedding = get_embedding_model().encode([user_prompt])[0]
+    category, similarity, margin = classify_locally(embedding)
+    if is_confident(similarity, margin):
+        return category
+
+    # Ambiguous query: let the LLM decide, but keep the local guess if it is unreachable
+    if not os.getenv("GOOGLE_API_KEY"):
+        print(f"Category ambiguous hai (score={similarity:.2f}), API key nahi hai isliye local guess '{category}' use ho raha hai.")
+        return category
+    return get_category_from_llm(user_prompt)
+
+
+def find_similar_prompts(user_prompt: str, category: str, top_k: int = 3, context: QueryContext = None) -> list:
     """
-    Finds the most similar prompts from the database within a specific category.
+    Finds the most similar answered prompts (usable as examples) from the database within a
+    specific category, best first. Each result carries its cosine `similarity` to the query.
+    If a `context` is given, its cached embedding is reused instead of encoding the prompt again,
+    and when it has a `user_id` the user's own shard is searched as well and merged in.
     """
-    global hissab_db
-    if hissab_db is None or hissab_db.empty:
+    ensure_vector_db()
+    if len(hissab_db) == 0:
         return []
 
-    # 1. Filter the database for the given category
-    category_df = hissab_db[hissab_db['category'] == category]
-    if category_df.empty:
-        return []
+    # 1. Generate embedding for the new user prompt (or reuse the one from this request)
+    if context is not None:
+        user_embedding = context.get_embedding()
+    else:
+        user_embedding = get_embedding_model().encode([user_prompt])[0]
 
-    # 2. Generate embedding for the new user prompt
-    user_embedding = embedding_model.encode([user_prompt])[0]
+    # 2. Top-k search in the category's index (exact: one dot product + argpartition)
+    with tracing.span("retrieval", context.trace if context is not None else None):
+        with _index_lock:
+            top_rows, top_scores = _index.search(category, user_embedding, top_k)
 
-    # 3. Calculate cosine similarity
-    all_embeddings = np.array(category_df['embedding'].tolist())
-    similarities = cosine_similarity([user_embedding], all_embeddings)[0]
+        similar_examples = []
+        for row, score in zip(top_rows, top_scores):
+            record = hissab_db.get_record(row)
+            similar_examples.append({'user_text': record['user_text'], 'model_response': record['model_response'],
+                                     'similarity': float(score)})
+
+        if context is not None and context.user_id is not None:
+            for record, score in get_shards().search(context.user_id, category, user_embedding, top_k):
+                similar_examples.append({'user_text': record['user_text'], 'model_response': record['model_response'],
+                                         'similarity': score})
+            similar_examples.sort(key=lambda example: example['similarity'], reverse=True)
+            similar_examples = similar_examples[:top_k]
 
-    # 4. Get the top_k most similar prompts
-    # We use argsort to get indices of the most similar items
-    top_indices = np.argsort(similarities)[-top_k:][::-1]
-    
-    similar_examples = category_df.iloc[top_indices][['user_text', 'model_response']].to_dict(orient='records')
-    
     return similar_examples
 
-def add_user_prompt_to_db(user_prompt: str):
+def get_shards() -> ShardManager:
+    """Returns the process-wide manager of per-user shards, created on first use."""
+    global _shards
+    with _shards_lock:
+        if _shards is None:
+            _shards = ShardManager(dtype=VECTOR_DTYPE)
+        return _shards
+
+def _commit_prompts(items: list):
+    """
+    Commits a batch of new prompts: the ones without an embedding are encoded in one call,
+    the ones without a category are classified, shared prompts go to the store in one atomic
+    append (then folded into the classifier sums under _index_lock if labelled), and prompts with a
+    user_id go to that user's shard for the category, together with their response.
+    Items are dicts with 'user_text', 'category', 'embedding' (either may be None), 'user_id'
+    and 'model_response'.
+    """
+    ensure_vector_db()
+    missing = [item for item in items if item['embedding'] is None]
+    if missing:
+        with tracing.span("embedding"):
+            embeddings = get_embedding_model().encode([item['user_text'] for item in missing])
+        for item, embedding in zip(missing, embeddings):
+            item['embedding'] = embedding
+    for item in items:
+        if item['category'] is None:
+            item['category'] = get_category_from_prompt(
+                item['user_text'], context=QueryContext(item['user_text'], embedding=item['embedding']))
+
+    shared = [item for item in items if item.get('user_id') is None]
+    per_user = {}
+    for item in items:
+        if item.get('user_id') is not None:
+            per_user.setdefault((item['user_id'], item['category']), []).append(item)
+
+    with tracing.span("db_write"):
+        if shared:
+            # Shared rows carry no model_response (an unreviewed answer should not become an
+            # example for everyone), so they stay out of the example index and the centroids
+            records = [{'category': item['category'], 'user_text': item['user_text'], 'model_response': ''} for item in shared]
+            embeddings = np.asarray([item['embedding'] for item in shared], dtype=np.float32)
+            # The durable append (and its fsyncs) runs outside _index_lock; the lock is only
+            # taken to fold the now-committed rows into the sums, past the row watermark
+            hissab_db.append(records, embeddings)
+            with _index_lock:
+                _fold_new_rows()
+
+        # A user's own answers are useful examples for that same user
+        for (user_id, category), user_items in per_user.items():
+            records = [{'category': category, 'user_text': item['user_text'], 'model_response': item.get('model_response', '')}
+                       for item in user_items]
+            get_shards().append(user_id, category, records, [item['embedding'] for item in user_items])
+    print(f"DB update ho gaya hai ({len(items)} naye prompts).")
+
+def _get_write_queue() -> WriteBehindQueue:
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteBehindQueue(_commit_prompts, max_size=WRITE_QUEUE_SIZE,
+                                            batch_size=WRITE_BATCH_SIZE, flush_interval_ms=WRITE_FLUSH_MS)
+        return _write_queue
+
+def _pending_item(user_prompt: str, context: QueryContext = None, model_response: str = "") -> dict:
+    return {'user_text': user_prompt,
+            'category': context.category if context is not None else None,
+            'embedding': context.embedding if context is not None else None,
+            'user_id': context.user_id if context is not None else None,
+            'model_response': model_response}
+
+def add_user_prompt_to_db(user_prompt: str, context: QueryContext = None, model_response: str = ""):
     """
-    Adds a new user prompt to the in-memory database and saves it back to the file.
-    This allows the DB to grow and improve over time.
+    Adds a new user prompt to the vector store so the DB grows and improves over time.
+    With write-behind enabled (the default) the prompt is only queued here and the background
+    worker commits it with the next batch, so the request does not wait for any disk I/O.
+    If a `context` is given, its cached category and embedding are reused; if it has a
+    `user_id`, the prompt and `model_response` go to that user's shard instead of the shared store.
     """
-    global hissab_db
     print(f"Naya prompt DB mein add kiya ja raha hai: '{user_prompt}'")
-    
-    # To add a new prompt, we must first classify it
-    category = get_category_from_prompt(user_prompt)
-    embedding = embedding_model.encode([user_prompt])[0]
-    
-    # We add it without a model_response for now, as it's just for future semantic matching
-    new_entry = pd.DataFrame([{'category': category, 'user_text': user_prompt, 'embedding': embedding, 'model_response': ''}])
-    
-    hissab_db = pd.concat([hissab_db, new_entry], ignore_index=True)
-    
-    # Save the updated database to the file for persistence
-    hissab_db.to_pickle(DB_FILE_PATH)
-    print("DB update ho gaya hai.")
\ No newline at end of file
+    if WRITE_BEHIND_ENABLED:
+        _get_write_queue().submit(_pending_item(user_prompt, context, model_response))
+    else:
+        _commit_prompts([_pending_item(user_prompt, context, model_response)])
+
+def add_user_prompts_to_db(user_prompts: list, contexts: list = None):
+    """Synchronously commits many prompts as a single batch (used by batch.py)."""
+    if not user_prompts:
+        return
+    contexts = contexts or [None] * len(user_prompts)
+    _commit_prompts([_pending_item(prompt, context) for prompt, context in zip(user_prompts, contexts)])
+
+def flush_writes(timeout: float = None) -> bool:
+    """Waits until every queued prompt is committed. Returns False on timeout."""
+    return _write_queue.flush(timeout) if _write_queue is not None else True
+
+def write_queue_metrics() -> dict:
+    """Queue depth and flush latency of the write-behind worker (empty if it never started)."""
+    return _write_queue.metrics() if _write_queue is not None else {}
@@ -0,0 +1,133 @@
+# write_behind.py - Background Write-Behind Queue
+#
+# Requests hand their DB writes to a bounded queue and return immediately. One daemon worker
+# drains the queue in batches (up to `batch_size` items, or whatever arrived within
+# `flush_interval_ms` of the first one) and passes each batch to a commit function, so the
+# expensive parts (encoding, fsync) are paid once per batch instead of once per request.
+#
+# The queue never blocks a request: when it is full the item is dropped and counted, since a
+# missed learning example is cheaper than a stalled response. Pending items are flushed at
+# interpreter exit.
+
+import atexit
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+
+class WriteBehindQueue:
+    """
+    Bounded write-behind queue with a single background committer.
+
+    Args:
+        commit: Called with a list of queued items; runs on the worker thread only.
+        max_size: Maximum number of items waiting to be committed.
+        batch_size: Maximum items per commit.
+        flush_interval_ms: How long the worker waits for more items before committing a batch.
+    """
+
+    def __init__(self, commit, max_size: int = 1000, batch_size: int = 64, flush_interval_ms: float = 250,
+                 name: str = "hissab-write-behind"):
+        self._commit = commit
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_size)
+        # Items submitted but not yet committed (queued or in the current batch), for flush()
+        self._pending = 0
+        self._pending_done = threading.Condition()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        # Metrics
+        self._metrics_lock = threading.Lock()
+        self._flush_ms = deque(maxlen=256)
+        self.enqueued = 0
+        self.committed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush, 5.0)
+
+    def submit(self, item) -> bool:
+        """Queues `item` for the next batch. Returns False (and counts a drop) if the queue is full."""
+        self._ensure_worker()
+        with self._pending_done:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._finish(1)
+            with self._metrics_lock:
+                self.dropped += 1
+            print("Write-behind queue bhari hui hai, naya prompt chhod diya gaya.")
+            return False
+        with self._metrics_lock:
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            start = time.perf_counter()
+            try:
+                self._commit(batch)
+                succeeded = True
+            except Exception as e:
+                succeeded = False
+                print(f"Write-behind batch ({len(batch)} prompts) commit nahi ho paya: {e}")
+            with self._metrics_lock:
+                self._flush_ms.append((time.perf_counter() - start) * 1000)
+                self.batches += 1
+                if succeeded:
+                    self.committed += len(batch)
+                else:
+                    self.failed += len(batch)
+            self._finish(len(batch))
+
+    def _finish(self, count: int):
+        with self._pending_done:
+            self._pending -= count
+            if self._pending == 0:
+                self._pending_done.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Waits until everything queued so far is committed. Returns False on timeout."""
+        with self._pending_done:
+            return self._pending_done.wait_for(lambda: self._pending == 0, timeout)
+
+    def metrics(self) -> dict:
+        """Queue depth, throughput counters and flush (commit) latency in milliseconds."""
+        with self._metrics_lock:
+            flush_ms = sorted(self._flush_ms)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "committed": self.committed,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "flush_ms_last": round(self._flush_ms[-1], 2) if flush_ms else None,
+                "flush_ms_p50": round(statistics.median(flush_ms), 2) if flush_ms else None,
+                "flush_ms_p95": round(flush_ms[int(0.95 * (len(flush_ms) - 1))], 2) if flush_ms else None,
+            }